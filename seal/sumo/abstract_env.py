@@ -1,6 +1,10 @@
 import gym
 import numpy as np
 import os
+import random
+import shutil
+import tempfile
+import weakref
 
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Tuple
@@ -9,13 +13,19 @@ from ray.rllib.env import MultiAgentEnv
 from seal.sumo.config import *
 from seal.sumo.kernel.kernel import SumoKernel
 from seal.sumo.timer import ActionTimer
+from seal.sumo.utils.core import make_scratch_dir
 from seal.sumo.utils.random_routes import generate_random_routes
+from seal.sumo.utils.route_cache import RouteCache
+from seal.sumo.utils.route_pool import RoutePool
 
 
 class AbstractSumoEnv(ABC, MultiAgentEnv):
 
     def __init__(self, config: Dict[str, Any]):
-        self.config = config
+        # NOTE: A copy, so that the state of this env (e.g., the path of its generated
+        #       route file) never leaks into the config of another env built from the
+        #       same dict.
+        self.config = dict(config)
         self.path = os.path.split(
             self.config["net-file"])[0]  # Example: "foo/bar" => "foo"
         self.ranked = config.get("ranked", DEFUALT_RANKED)
@@ -26,9 +36,21 @@ class AbstractSumoEnv(ABC, MultiAgentEnv):
         # config), then a private flag, `__first_rand_routes_flag`, is set to True. This
         # forces the `reset()` function to generate at least ONE random route file before
         # being updated to False. This will never change back to True (hence the privacy).
-        if self.config.get("route-files", None) is None:
-            self.config["route-files"] = os.path.join(
-                self.path, "traffic.rou.xml")
+        #
+        # Generated route (and trip) files are written to a scratch directory private to
+        # this env, so that envs of parallel rollout workers that share a net-file do not
+        # race on the same files. The directory is removed on `close()` (or once this env
+        # is garbage collected). The route file currently simulated is `self.routefile`.
+        self.snapshot = self.config.get("snapshot", DEFAULT_SNAPSHOT)
+        self.scratch_dir = None
+        if self.config.get("route-files", None) is None or self.snapshot:
+            self.scratch_dir = make_scratch_dir(
+                self.config.get("scratch_root", DEFAULT_SCRATCH_ROOT))
+            self.__remove_scratch_dir = weakref.finalize(
+                self, shutil.rmtree, self.scratch_dir, ignore_errors=True)
+        self.routefile = self.config.get("route-files", None)
+        if self.routefile is None:
+            self.routefile = os.path.join(self.scratch_dir, "traffic.rou.xml")
             self.rand_routes_on_reset = self.config.get(
                 "rand_routes_on_reset", True)
             self.__first_rand_routes_flag = True
@@ -36,7 +58,40 @@ class AbstractSumoEnv(ABC, MultiAgentEnv):
             self.rand_routes_on_reset = False
             self.__first_rand_routes_flag = False
 
-        self.kernel = SumoKernel(self.config)
+        # Random routes are reproducible if a base `seed` is provided: the i-th generated
+        # route file uses `seed + i`. The routed files of such seeded scenarios can be
+        # reused across runs through a `RouteCache`.
+        self.route_seed = self.config.get("seed", DEFAULT_SEED)
+        self.__n_rand_routes = 0
+        self.route_cache = None
+        cache_dir = self.config.get("route_cache_dir", DEFAULT_ROUTE_CACHE_DIR)
+        if cache_dir is not None:
+            self.route_cache = RouteCache(
+                cache_dir,
+                self.config.get("route_cache_max_bytes", DEFAULT_ROUTE_CACHE_MAX_BYTES)
+            )
+
+        # If random routes are generated on every reset, they can be generated ahead of
+        # time by a pool of background processes (see `RoutePool`).
+        self.route_pool = None
+        pool_size = self.config.get("route_pool_size", DEFAULT_ROUTE_POOL_SIZE)
+        if self.rand_routes_on_reset and pool_size > 0:
+            self.route_pool = RoutePool(
+                self.config["net-file"],
+                directory=tempfile.mkdtemp(prefix="routes-", dir=self.scratch_dir),
+                size=pool_size,
+                rand_args=self.config.get("rand_route_args", dict()),
+                seed=self.route_seed,
+                cache=self.route_cache
+            )
+
+        # In snapshot mode, a pool of warmed-up simulation states (each with its own
+        # route file if routes are random) is saved on the first reset. Every reset then
+        # restores one of them rather than reloading and re-simulating from time zero.
+        self.snapshots = []
+        self.__snapshot_rng = random.Random(self.route_seed)
+
+        self.kernel = SumoKernel({**self.config, "route-files": self.routefile})
         self.action_timer = ActionTimer(len(self.kernel.tls_hub))
         self.reset()
 
@@ -48,26 +103,93 @@ class AbstractSumoEnv(ABC, MultiAgentEnv):
         Any
             The observation of the state space upon resetting the simulation/environment.
         """
-        if self.rand_routes_on_reset or self.__first_rand_routes_flag:
-            self.rand_routes()
-            self.__first_rand_routes_flag = False
-        self.kernel.start()
-        self.action_timer.restart()
-        return self._observe()
+        # The profiler (if enabled) starts a new episode, whose first entry is the reset.
+        profiler = self.kernel.profiler
+        profiler.reset()
+        with profiler.section("reset"):
+            if self.snapshot:
+                if len(self.snapshots) == 0:
+                    self.save_snapshots()
+                routefile, statefile = self.__snapshot_rng.choice(self.snapshots)
+                self.__set_routefile(routefile)
+                self.kernel.load_state(statefile)
+            else:
+                if self.rand_routes_on_reset or self.__first_rand_routes_flag:
+                    self.rand_routes()
+                    self.__first_rand_routes_flag = False
+                self.kernel.start()
+            self.action_timer.restart()
+            obs = self._observe()
+        profiler.end_step(is_reset=True)
+        return obs
+
+    def save_snapshots(self) -> None:
+        """Simulate and save the pool of warmed-up states restored in snapshot mode. Each
+           state is saved after `warmup_steps` simulation steps (during which the
+           trafficlights run their own programs) and, if routes are random, with newly
+           generated routes.
+        """
+        pool_size = self.config.get("snapshot_pool_size", DEFAULT_SNAPSHOT_POOL_SIZE)
+        warmup_steps = self.config.get("warmup_steps", DEFAULT_WARMUP_STEPS)
+        random_routes = self.rand_routes_on_reset or self.__first_rand_routes_flag
+        if not random_routes:
+            pool_size = 1
+
+        self.snapshots = []
+        for i in range(pool_size):
+            if random_routes:
+                self.rand_routes()
+                self.__first_rand_routes_flag = False
+                # Keep a private copy since the generated route file gets overwritten
+                # (or deleted by the route pool) when the next one is generated.
+                routefile = os.path.join(self.scratch_dir, f"snapshot_{i}.rou.xml")
+                shutil.copyfile(self.routefile, routefile)
+                self.__set_routefile(routefile)
+
+            self.kernel.start()
+            for _ in range(warmup_steps):
+                self.kernel.step()
+            statefile = os.path.join(self.scratch_dir, f"snapshot_{i}.xml")
+            self.kernel.save_state(statefile)
+            self.snapshots.append((self.routefile, statefile))
+
+        # Routes are never generated again once the snapshots are saved (every reset
+        # restores one of them), so the route pool's processes and files are released.
+        if self.route_pool is not None:
+            self.route_pool.close()
+            self.route_pool = None
 
     def rand_routes(self) -> None:
         """Generate random routes based on the details in the configuration dict provided
            at initialization.
         """
-        net_name = self.config["net-file"]
-        rand_args = self.config.get("rand_route_args", dict())
-        # NOTE: Simplifies process, so leave this for now.
-        rand_args["n_routefiles"] = 1
-        generate_random_routes(net_name=net_name, path=self.path, **rand_args)
-        # TODO: Implement dynamic seed.
+        with self.kernel.profiler.section("route_generation"):
+            if self.route_pool is not None:
+                routefile = self.route_pool.get()
+            else:
+                net_name = self.config["net-file"]
+                rand_args = dict(self.config.get("rand_route_args", dict()))
+                # NOTE: Simplifies process, so leave this for now.
+                rand_args["n_routefiles"] = 1
+                if self.route_seed is not None:
+                    rand_args["seed"] = self.route_seed + self.__n_rand_routes
+                routefile = generate_random_routes(
+                    net_name=net_name, path=self.scratch_dir, cache=self.route_cache,
+                    **rand_args)[0]
+        self.__n_rand_routes += 1
+        self.__set_routefile(routefile)
+
+    def __set_routefile(self, routefile: str) -> None:
+        self.routefile = routefile
+        self.kernel.config["route-files"] = routefile
 
     def close(self) -> None:
         self.kernel.close()
+        if self.route_pool is not None:
+            self.route_pool.close()
+            self.route_pool = None
+        if self.scratch_dir is not None:
+            self.__remove_scratch_dir()
 
     ## ============================================================================== ##
     ## ......ABSTRACT METHODS THAT NEED TO BE IMPLEMENTED BY CHILDREN CLASSES........ ##
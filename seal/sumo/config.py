@@ -9,6 +9,82 @@ LANE_OCCUPANCY, HALTED_LANE_OCCUPANCY, SPEED_RATIO, PHASE_STATE_MODE, PHASE_STAT
     LOCAL_RANK, GLOBAL_RANK = range(N_RANKED_FEATURES)
 
 HALTING_SPEED = 0.1
+# Range (in meters) of the per-lane context subscriptions. It is kept positive since a
+# range of 0 only catches vehicles whose distance to the lane shape is computed as
+# exactly 0, which floating-point error can miss on curved or diagonal lanes. Vehicles
+# that the range catches on other lanes are filtered out by their lane ID.
+CONTEXT_RANGE = 1.0
+
+# If True, `SumoKernel.start()` sets up TraCI subscriptions for every trafficlight so
+# that observations are read from the bulk result returned by each simulation step.
+DEFAULT_SUBSCRIBE = False
+
+# Library used to talk to SUMO: "traci" (socket client to a SUMO subprocess) or
+# "libsumo" (in-process bindings, no GUI).
+DEFAULT_BACKEND = "traci"
+
+# If True, the trafficlight metadata derived from a net-file is cached next to it (in a
+# "*.seal-cache.json" header and a memory-mapped "*.seal-cache.<hash>.npy" data file)
+# and reused until the net-file's contents change.
+DEFAULT_NET_CACHE = True
+
+# If True, `SumoEnv` fills a single preallocated (n_trafficlights, n_features) matrix
+# with the observations every step instead of allocating one array per trafficlight.
+DEFAULT_MATRIX_OBS = False
+
+# Number of random route files generated ahead of time by background processes when
+# routes are randomized on reset (0 generates them synchronously in `reset()`).
+DEFAULT_ROUTE_POOL_SIZE = 0
+
+# Base seed for random route generation (the i-th generated route file uses seed + i);
+# None generates unseeded (i.e., non-reproducible) routes.
+DEFAULT_SEED = None
+
+# Directory of the cache of routed files for seeded scenarios (None disables the cache)
+# and its disk budget in bytes.
+DEFAULT_ROUTE_CACHE_DIR = None
+DEFAULT_ROUTE_CACHE_MAX_BYTES = 1 << 30
+
+# Directory in which each env creates its private scratch directory for generated route
+# and trip files (None prefers "/dev/shm", falling back to the system's temp directory).
+DEFAULT_SCRATCH_ROOT = None
+
+# Whether `reset()` restores a saved (warmed-up) simulation state instead of reloading
+# the simulation from time zero, how many states (each with its own demand) are saved,
+# and how many simulation steps are run before each state is saved.
+DEFAULT_SNAPSHOT = False
+DEFAULT_SNAPSHOT_POOL_SIZE = 1
+DEFAULT_WARMUP_STEPS = 0
+
+# Number of simulation steps per env step (i.e., per decision of the trafficlights) and
+# how the observations of those steps are aggregated ("last" or "mean"). Rewards are
+# summed over the steps.
+DEFAULT_DECISION_INTERVAL = 1
+DEFAULT_OBS_AGGREGATION = "last"
+VALID_OBS_AGGREGATIONS = ["last", "mean"]
+
+# Maximum number of env steps per episode (None disables the limit). An episode is also
+# cut short once the mean halted lane occupancy of the trafficlights stays above the
+# gridlock threshold (None disables the check) for `gridlock_patience` env steps in a
+# row. Either way, the episode ends with a truncation flag in the `info` dict.
+DEFAULT_MAX_STEPS = None
+DEFAULT_GRIDLOCK_THRESHOLD = None
+DEFAULT_GRIDLOCK_PATIENCE = 100
+
+# Number of simulations stepped side by side by a `VectorSumoEnv`, and the offset between
+# the route seeds of consecutive simulations (if a `seed` is given).
+DEFAULT_NUM_ENVS = 1
+VECTOR_SEED_STRIDE = 100_000
+
+# Whether env steps are pipelined: the next simulation step runs on an I/O thread while
+# the ranks and rewards of the current one are computed. The observations and rewards
+# returned by `step(actions)` then describe the simulation right *before* `actions` took
+# effect (i.e., they are delayed by one step).
+DEFAULT_PIPELINE = False
+
+# Whether the kernel and env record per-step timings and TraCI call counts (see
+# `StepProfiler`); these are then added to the `info` dict of every step.
+DEFAULT_PROFILE = False
 
 SPACE_DTYPE = float32
 
@@ -3,14 +3,41 @@ import numpy as np
 from gym import spaces
 from seal.sumo.config import *
 from seal.sumo.abstract_env import AbstractSumoEnv
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Tuple
 
 
 class SumoEnv(AbstractSumoEnv):
 
     def __init__(self, config):
+        # The matrix observation mode must be set up before `super().__init__()` since
+        # it calls `reset()`. The matrix itself is allocated on the first observation.
+        self.matrix_obs = config.get("matrix_obs", DEFAULT_MATRIX_OBS)
+        self._obs_matrix = None
+        self._obs_buffer = None
+        self.decision_interval = config.get("decision_interval",
+                                            DEFAULT_DECISION_INTERVAL)
+        self.obs_aggregation = config.get("obs_aggregation", DEFAULT_OBS_AGGREGATION)
+        assert self.decision_interval >= 1, "`decision_interval` must be positive."
+        assert self.obs_aggregation in VALID_OBS_AGGREGATIONS, \
+            f"`obs_aggregation` must be in {VALID_OBS_AGGREGATIONS}."
+        self.max_steps = config.get("max_steps", DEFAULT_MAX_STEPS)
+        self.gridlock_threshold = config.get("gridlock_threshold",
+                                             DEFAULT_GRIDLOCK_THRESHOLD)
+        self.gridlock_patience = config.get("gridlock_patience",
+                                            DEFAULT_GRIDLOCK_PATIENCE)
+        self.pipeline = config.get("pipeline", DEFAULT_PIPELINE)
+        assert not (self.pipeline and self.decision_interval > 1), \
+            "`pipeline` only supports a `decision_interval` of 1."
         super().__init__(config)
 
+    @property
+    def obs_matrix(self) -> np.ndarray:
+        """The (n_trafficlights, n_features) float32 matrix holding the latest
+           observations (rows ordered by trafficlight index) when `matrix_obs` is
+           enabled. It is overwritten in place every step, so copy it if it must be kept.
+        """
+        return self._obs_matrix
+
     @property
     def multi_action_space(self) -> spaces.Space:
         return spaces.Dict({
@@ -46,24 +73,165 @@ class SumoEnv(AbstractSumoEnv):
     def observation_spaces(self, tls_id) -> spaces.Space:
         return self.kernel.tls_hub[tls_id].observation_space
 
+    def reset(self) -> Dict[Any, np.ndarray]:
+        self.n_steps = 0
+        self.__gridlocked_steps = 0
+        return super().reset()
+
     def step(self, action_dict: Dict[Any, int]) -> Tuple[Dict, Dict, Dict, Dict]:
-        taken_action = self._do_action(action_dict)
-        self.kernel.step()
-
-        obs = self._observe()
-        reward = {
-            tls.id: self._get_reward(obs[tls.id])
-            for tls in self.kernel.tls_hub
-        }
-        done = {"__all__": self.kernel.done()}
+        profiler = self.kernel.profiler
+        with profiler.section("step"):
+            obs, reward, sim_done = self._advance(action_dict)
+            if profiler.enabled:
+                # A pipelined simulation step may still be running on the kernel's I/O
+                # thread. It is awaited (after the ranks and rewards it overlaps with) so
+                # that its timings and TraCI calls are recorded as part of this step, and
+                # so that nothing is recorded while `end_step()` reads the profiler.
+                self.kernel.wait()
+        self.n_steps += 1
+
         # info = {"taken_action": taken_action,
         #         "total_reward": sum(reward.values())}
         info = {}
+        # An episode that ends on its own on the same step is not truncated.
+        truncation = None if sim_done else self._get_truncation(obs)
+        done = {"__all__": sim_done or truncation is not None}
+        if truncation is not None or profiler.enabled:
+            # RLlib expects the info of a multi-agent env to be keyed by agent ID.
+            episode_info = {}
+            if truncation is not None:
+                episode_info.update({"TimeLimit.truncated": True,
+                                     "truncation": truncation})
+            if profiler.enabled:
+                episode_info["profile"] = profiler.end_step()
+                if done["__all__"]:
+                    episode_info["profile_summary"] = profiler.summary()
+            info = {tls_id: episode_info for tls_id in obs}
 
         return obs, reward, done, info
 
-    def _do_action(self, actions: Dict[Any, int]) -> List[int]:
-        """Perform the provided action for each trafficlight.
+    def _advance(self, actions: Dict[Any, int]) -> Tuple[Dict, Dict, bool]:
+        """Apply the actions and advance the simulation by one env step (see `pipeline`
+           and `decision_interval`).
+
+        Args:
+            actions (Dict[Any, int]): The action that each trafficlight will take.
+
+        Returns:
+            Tuple[Dict, Dict, bool]: The observation and reward of each trafficlight, and
+                whether the simulation is done.
+        """
+        if self.pipeline:
+            return self._step_pipelined(actions)
+
+        self._do_action(actions)
+        if self.decision_interval > 1:
+            obs, reward = self._step_interval()
+        else:
+            self.kernel.step()
+            if self.matrix_obs:
+                obs_matrix = self._observe_matrix()
+                obs = self._get_agent_obs(obs_matrix)
+                reward = dict(zip(self.kernel.tls_hub.ids,
+                                  self._get_rewards(obs_matrix).tolist()))
+            else:
+                obs = self._observe()
+                with self.kernel.profiler.section("reward"):
+                    reward = {
+                        tls.id: self._get_reward(obs[tls.id])
+                        for tls in self.kernel.tls_hub
+                    }
+        return obs, reward, self.kernel.done()
+
+    def _get_truncation(self, obs: Dict[Any, np.ndarray]) -> str:
+        """Check whether the episode must be cut short, either because it reached
+           `max_steps` or because the network has been gridlocked (i.e., the mean halted
+           lane occupancy was above `gridlock_threshold`) for `gridlock_patience` steps
+           in a row.
+
+        Args:
+            obs (Dict[Any, np.ndarray]): The observations of the current step.
+
+        Returns:
+            str: The reason of the truncation ("max_steps" or "gridlock"), or None if the
+                episode goes on.
+        """
+        if self.gridlock_threshold is not None:
+            halted = np.mean([tls_obs[HALTED_LANE_OCCUPANCY] for tls_obs in obs.values()])
+            if halted > self.gridlock_threshold:
+                self.__gridlocked_steps += 1
+            else:
+                self.__gridlocked_steps = 0
+            if self.__gridlocked_steps >= self.gridlock_patience:
+                return "gridlock"
+        if self.max_steps is not None and self.n_steps >= self.max_steps:
+            return "max_steps"
+        return None
+
+    def _step_pipelined(self, actions: Dict[Any, int]) -> Tuple[Dict, Dict, bool]:
+        """Pipelined version of a single step: the observations are fetched and the
+           actions are applied as soon as the previous simulation step is done, and the
+           next simulation step then runs on the kernel's I/O thread while the ranks and
+           rewards are computed. As such, the returned observations, rewards, and done
+           flag describe the simulation *before* the given actions took effect, i.e., they
+           are delayed by one step compared to a regular step.
+
+        Args:
+            actions (Dict[Any, int]): The action that each trafficlight will take.
+
+        Returns:
+            Tuple[Dict, Dict, bool]: The observation and reward of each trafficlight, and
+                whether the simulation is done.
+        """
+        self.kernel.wait()
+        sim_done = self.kernel.done()
+        obs_matrix = self._observe_matrix(rank=False)
+        if not sim_done:
+            self._do_action(actions)
+            self.kernel.step_async()
+
+        # Nothing below talks to SUMO, so it overlaps with the simulation step.
+        if self.ranked:
+            self._rank_matrix(obs_matrix, self._occupancy)
+        obs = self._get_agent_obs(obs_matrix)
+        reward = dict(zip(self.kernel.tls_hub.ids,
+                          self._get_rewards(obs_matrix).tolist()))
+        return obs, reward, sim_done
+
+    def _step_interval(self) -> Tuple[Dict, Dict]:
+        """Simulate the `decision_interval` steps of one env step (stopping early if the
+           simulation is done). The observations of these steps are aggregated with
+           `obs_aggregation` (and then ranked), and the rewards are summed.
+
+        Returns:
+            Tuple[Dict, Dict]: The observation and reward of each trafficlight.
+        """
+        rewards = np.zeros(len(self.kernel.tls_hub))
+        obs_sum = None
+        for n_steps in range(1, self.decision_interval+1):
+            self.kernel.step()
+            obs_matrix = self._observe_matrix(rank=False)
+            rewards += self._get_rewards(obs_matrix)
+            if self.obs_aggregation == "mean":
+                obs_sum = self._obs_buffer.copy() if obs_sum is None \
+                          else obs_sum + self._obs_buffer
+            if self.kernel.done():
+                break
+
+        occupancy = self._occupancy
+        if self.obs_aggregation == "mean":
+            obs_mean = obs_sum / n_steps
+            obs_matrix[:] = obs_mean
+            occupancy = obs_mean[:, LANE_OCCUPANCY]
+        if self.ranked:
+            self._rank_matrix(obs_matrix, occupancy)
+        obs = self._get_agent_obs(obs_matrix)
+        return obs, dict(zip(self.kernel.tls_hub.ids, rewards.tolist()))
+
+    def _do_action(self, actions: Dict[Any, int]) -> Dict[Any, int]:
+        """Perform the provided action for each trafficlight. Which trafficlights switch
+           to their next phase is decided for all of them at once, and only those that
+           do switch are updated through the SUMO backend.
 
         Args:
             actions (Dict[Any, int]): The action that each trafficlight will take
@@ -72,15 +240,21 @@ class SumoEnv(AbstractSumoEnv):
             Dict[Any, int]: Returns the action taken -- influenced by which moves are
                 legal or not.
         """
-        taken_action = actions.copy()
-        for tls in self.kernel.tls_hub:
-            if actions[tls.id] == 1 and self.action_timer.can_change(tls.index):
-                tls.next_phase()
-                self.action_timer.restart(tls.index)
-            else:
-                self.action_timer.decr(tls.index)
-                taken_action[tls.index] = 0
-        return taken_action
+        with self.kernel.profiler.section("do_action"):
+            hub = self.kernel.tls_hub
+            requested = np.asarray([actions[tls_id] for tls_id in hub.ids])
+            switch = (requested.reshape(len(hub)) == 1) & self.action_timer.can_change()
+            # Switching timers restart and then run for the rest of the decision interval.
+            self.action_timer.restart(switch)
+            self.action_timer.decr(switch, steps=self.decision_interval-1)
+            self.action_timer.decr(~switch, steps=self.decision_interval)
+
+            taken_action = actions.copy()
+            for index in np.flatnonzero(switch):
+                hub[hub.index2id[index]].next_phase()
+            for index in np.flatnonzero(~switch):
+                taken_action[hub.index2id[index]] = 0
+            return taken_action
 
     def _get_reward(self, obs: np.ndarray) -> float:
         """Negative reward function based on the number of halting vehicles, waiting time,
@@ -98,6 +272,22 @@ class SumoEnv(AbstractSumoEnv):
         """
         return -(obs[LANE_OCCUPANCY] + obs[HALTED_LANE_OCCUPANCY])
 
+    def _get_rewards(self, obs_matrix: np.ndarray) -> np.ndarray:
+        """Vectorized version of `_get_reward()` over the observation matrix.
+
+        Parameters
+        ----------
+        obs_matrix : np.ndarray
+            Observations of all the trafficlights (rows ordered by trafficlight index).
+
+        Returns
+        -------
+        np.ndarray
+            The reward of each trafficlight for this step.
+        """
+        with self.kernel.profiler.section("reward"):
+            return -(obs_matrix[:, LANE_OCCUPANCY] + obs_matrix[:, HALTED_LANE_OCCUPANCY])
+
     def _observe(self) -> Dict[Any, np.ndarray]:
         """Get the observations across all the trafficlights, indexed by trafficlight id.
 
@@ -106,41 +296,87 @@ class SumoEnv(AbstractSumoEnv):
         Dict[Any, np.ndarray]
             Observations from each trafficlight.
         """
-        obs = {tls.id: tls.get_observation() for tls in self.kernel.tls_hub}
+        if self.matrix_obs:
+            return self._get_agent_obs(self._observe_matrix())
+        with self.kernel.profiler.section("observe"):
+            obs = {tls.id: tls.get_observation() for tls in self.kernel.tls_hub}
         if self.ranked:
             self._get_ranks(obs)
         return obs
 
+    def _observe_matrix(self, rank: bool=True) -> np.ndarray:
+        """Fill the preallocated observation matrix in place with the observations of all
+           the trafficlights (rows ordered by trafficlight index) and rank them.
+
+        Parameters
+        ----------
+        rank : bool, optional
+            Whether to compute the ranks (if the env is ranked), by default True.
+
+        Returns
+        -------
+        np.ndarray
+            The observation matrix (see `obs_matrix`).
+        """
+        if self._obs_matrix is None:
+            n_features = N_RANKED_FEATURES if self.ranked else N_UNRANKED_FEATURES
+            shape = (len(self.kernel.tls_hub), n_features)
+            self._obs_matrix = np.zeros(shape, dtype=SPACE_DTYPE)
+            # The observations are first written at full (float64) precision, which the
+            # ranks are computed from (see `_occupancy`), and then cast all at once.
+            self._obs_buffer = np.zeros(shape)
+        with self.kernel.profiler.section("observe"):
+            for tls in self.kernel.tls_hub:
+                tls.get_observation(out=self._obs_buffer[tls.index])
+            self._obs_matrix[:] = self._obs_buffer
+        if self.ranked and rank:
+            self._rank_matrix(self._obs_matrix, self._occupancy)
+        return self._obs_matrix
+
+    @property
+    def _occupancy(self) -> np.ndarray:
+        """The float64 lane occupancies of the latest observations (see
+           `_observe_matrix()`), so that ranks match those of the dict observations.
+        """
+        return self._obs_buffer[:, LANE_OCCUPANCY]
+
+    def _get_agent_obs(self, obs_matrix: np.ndarray) -> Dict[Any, np.ndarray]:
+        """Get the per-trafficlight observations that RLlib expects from the observation
+           matrix. RLlib keeps references to returned observations, so the rows are views
+           of a single snapshot of the matrix rather than of the matrix itself (which is
+           overwritten next step).
+
+        Returns
+        -------
+        Dict[Any, np.ndarray]
+            Observations from each trafficlight.
+        """
+        snapshot = obs_matrix.copy()
+        return {tls_id: snapshot[index]
+                for index, tls_id in enumerate(self.kernel.tls_hub.ids)}
+
     def _get_ranks(self, obs: Dict) -> None:
         """Appends global and local ranks to the observations in an inplace fashion.
 
         Args:
             obs (Dict): Observation provided by a trafficlight.
         """
-        pairs = [(tls_id, tls_state[LANE_OCCUPANCY])
-                 for tls_id, tls_state in obs.items()]
-        pairs = sorted(pairs, key=lambda x: x[1], reverse=True)
-        graph = self.kernel.tls_hub.tls_graph  # Adjacency list representation.
-
-        # Calculate the GLOBAL ranks for each tls in the road network.
-        for global_rank, (tls_id, _) in enumerate(pairs):
-            try:
-                obs[tls_id][GLOBAL_RANK] = 1 - (global_rank / (len(graph)-1))
-            except ZeroDivisionError:
-                obs[tls_id][GLOBAL_RANK] = 1
-
-        # Calculate LOCAL ranks based on global ranks from above.
-        for tls_id in graph:
-            local_rank = 0
-            for neighbor in graph[tls_id]:
-                if obs[tls_id][GLOBAL_RANK] > obs[neighbor][GLOBAL_RANK]:
-                    local_rank += 1
-            try:
-                # We do *not* subtract the denominator by 1 (as we do with global
-                # rank) because `len(graph[tls_id])` does not include `tls_id` as a
-                # node in the sub-network when it should be included. This means that
-                # +1 node cancels out the -1 node.
-                obs[tls_id][LOCAL_RANK] = 1 - \
-                    (local_rank / len(graph[tls_id]))
-            except ZeroDivisionError:
-                obs[tls_id][LOCAL_RANK] = 1
+        ids = self.kernel.tls_hub.ids
+        obs_matrix = np.stack([obs[tls_id] for tls_id in ids])
+        self._rank_matrix(obs_matrix)
+        for index, tls_id in enumerate(ids):
+            obs[tls_id][GLOBAL_RANK] = obs_matrix[index, GLOBAL_RANK]
+            obs[tls_id][LOCAL_RANK] = obs_matrix[index, LOCAL_RANK]
+
+    def _rank_matrix(self, obs_matrix: np.ndarray, occupancy: np.ndarray=None) -> None:
+        """Computes the global and local ranks over a (n_trafficlights, n_features)
+           observation matrix (rows ordered by trafficlight index) in an inplace fashion
+           (see `TrafficLightHub.rank_matrix()`).
+
+        Args:
+            obs_matrix (np.ndarray): Observations of all the trafficlights.
+            occupancy (np.ndarray, optional): The (float64) lane occupancies to rank by.
+                Defaults to None (i.e., the `LANE_OCCUPANCY` column of `obs_matrix`).
+        """
+        with self.kernel.profiler.section("rank"):
+            self.kernel.tls_hub.rank_matrix(obs_matrix, occupancy)
@@ -0,0 +1,183 @@
+import itertools
+import traci
+
+from abc import ABC, abstractmethod
+from typing import Any, List
+
+from seal.sumo.config import DEFAULT_BACKEND
+
+
+class SumoBackend(ABC):
+    """A small interface over the library used to talk to a SUMO simulation. The kernel
+       and the trafficlights only use the domains exposed here (`trafficlight`, `lane`,
+       `vehicle`, and `simulation`) along with the lifecycle functions below, so they do
+       not need to know whether SUMO runs in a subprocess or in-process.
+    """
+
+    name: str
+    FatalError: type
+
+    trafficlight: Any
+    lane: Any
+    vehicle: Any
+    simulation: Any
+
+    @abstractmethod
+    def start(self, command_args: List[str]) -> None:
+        raise NotImplementedError("Cannot be called from Abstract "
+                                  "Class `SumoBackend`.")
+
+    @abstractmethod
+    def load(self, args: List[str]) -> None:
+        raise NotImplementedError("Cannot be called from Abstract "
+                                  "Class `SumoBackend`.")
+
+    @abstractmethod
+    def simulation_step(self) -> None:
+        raise NotImplementedError("Cannot be called from Abstract "
+                                  "Class `SumoBackend`.")
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError("Cannot be called from Abstract "
+                                  "Class `SumoBackend`.")
+
+    @abstractmethod
+    def is_loaded(self) -> bool:
+        raise NotImplementedError("Cannot be called from Abstract "
+                                  "Class `SumoBackend`.")
+
+
+class TraciBackend(SumoBackend):
+    """Runs SUMO (or SUMO-GUI) as a subprocess and communicates with it through the
+       TraCI socket client. Each instance owns its own uniquely labelled connection
+       rather than TraCI's global default one, so several kernels (and thus several
+       `SumoEnv` instances) can run side by side in the same Python process.
+    """
+
+    name = "traci"
+    FatalError = traci.exceptions.FatalTraCIError
+    __label_counter = itertools.count()
+
+    def __init__(self) -> None:
+        self.label = f"seal-{next(TraciBackend.__label_counter)}"
+        self.__connection = None
+
+    @property
+    def connection(self) -> traci.connection.Connection:
+        if self.__connection is None:
+            raise self.FatalError(f"Connection '{self.label}' is not started.")
+        return self.__connection
+
+    @property
+    def trafficlight(self) -> Any:
+        return self.connection.trafficlight
+
+    @property
+    def lane(self) -> Any:
+        return self.connection.lane
+
+    @property
+    def vehicle(self) -> Any:
+        return self.connection.vehicle
+
+    @property
+    def simulation(self) -> Any:
+        return self.connection.simulation
+
+    def start(self, command_args: List[str]) -> None:
+        traci.start(command_args, label=self.label)
+        self.__connection = traci.getConnection(self.label)
+
+    def load(self, args: List[str]) -> None:
+        self.connection.load(args)
+
+    def simulation_step(self) -> None:
+        self.connection.simulationStep()
+
+    def close(self) -> None:
+        self.connection.close()
+        self.__connection = None
+
+    def is_loaded(self) -> bool:
+        try:
+            traci.getConnection(self.label)
+            return True
+        except:
+            return False
+
+
+class LibsumoBackend(SumoBackend):
+    """Runs SUMO in-process through the libsumo bindings. These expose the same calls as
+       TraCI without the socket serialization, but they do not support the GUI. Since
+       libsumo holds a single simulation per process, only one instance can be started
+       at a time.
+    """
+
+    name = "libsumo"
+    __active = None
+
+    def __init__(self) -> None:
+        try:
+            import libsumo
+        except ImportError as err:
+            raise ImportError("The 'libsumo' backend requires the libsumo Python "
+                              "bindings shipped with SUMO (see `$SUMO_HOME/tools`).") \
+                from err
+        self.__libsumo = libsumo
+        self.__loaded = False
+        self.FatalError = getattr(libsumo, "FatalTraCIError", libsumo.TraCIException)
+        self.trafficlight = libsumo.trafficlight
+        self.lane = libsumo.lane
+        self.vehicle = libsumo.vehicle
+        self.simulation = libsumo.simulation
+
+    def start(self, command_args: List[str]) -> None:
+        if LibsumoBackend.__active not in (None, self):
+            raise RuntimeError("Only one 'libsumo' simulation can run per process; use "
+                               "the 'traci' backend for several environments.")
+        self.__libsumo.start(command_args)
+        self.__loaded = True
+        LibsumoBackend.__active = self
+
+    def load(self, args: List[str]) -> None:
+        self.__libsumo.load(args)
+
+    def simulation_step(self) -> None:
+        self.__libsumo.simulationStep()
+
+    def close(self) -> None:
+        self.__libsumo.close()
+        self.__loaded = False
+        LibsumoBackend.__active = None
+
+    def is_loaded(self) -> bool:
+        return self.__loaded
+
+
+BACKENDS = {
+    TraciBackend.name: TraciBackend,
+    LibsumoBackend.name: LibsumoBackend,
+}
+
+
+def make_backend(name: str=DEFAULT_BACKEND, gui: bool=False) -> SumoBackend:
+    """Create the backend with the given name (i.e., 'traci' or 'libsumo').
+
+    Args:
+        name (str, optional): Name of the backend. Defaults to DEFAULT_BACKEND.
+        gui (bool, optional): Whether the simulation will be run with SUMO-GUI. Defaults
+            to False.
+
+    Raises:
+        ValueError: Occurs if the backend is unknown or if it cannot run the GUI.
+
+    Returns:
+        SumoBackend: The backend instance.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Parameter `backend` must be in {list(BACKENDS)}.")
+    if gui and name == LibsumoBackend.name:
+        raise ValueError("The 'libsumo' backend does not support the GUI; use the "
+                         "'traci' backend instead.")
+    return BACKENDS[name]()
@@ -0,0 +1,172 @@
+import glob
+import json
+import numpy as np
+import os
+import tempfile
+import warnings
+
+from typing import Any, Dict, List, Tuple
+
+from seal.sumo.kernel.trafficlight.light import LaneTable
+from seal.sumo.utils.core import file_hash
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".seal-cache"
+
+
+def get_cache_path(netfile: str) -> str:
+    """Get the path of the (JSON) metadata cache header stored next to the given
+       net-file."""
+    return netfile + CACHE_SUFFIX + ".json"
+
+
+def get_data_path(netfile: str, net_hash: str) -> str:
+    """Get the path of the (*.npy) array data of the metadata cache of the given
+       net-file. It is named after the net-file's content hash, so a header can never be
+       paired with the data written for another version of the net-file."""
+    return f"{netfile}{CACHE_SUFFIX}.{net_hash[:16]}.npy"
+
+
+def load_network_metadata(netfile: str) -> Dict[str, Any]:
+    """Load the cached metadata derived from the given net-file. The cache consists of a
+       JSON header (IDs, programs, lanes, and the layout of the arrays) and a single
+       *.npy file holding every numeric array, which is memory-mapped so that the arrays
+       are read-only views into it. The cache is only used if it was written from a
+       net-file with the exact same contents (i.e., content hash) and with the current
+       cache format. Neither file is unpickled, so no code is run from the cache.
+
+    Args:
+        netfile (str): Path to the SUMO *.net.xml file.
+
+    Returns:
+        Dict[str, Any]: The cached metadata, or None if there is no valid cache.
+    """
+    path = get_cache_path(netfile)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            header = json.load(f)
+        if header.get("version", None) != CACHE_VERSION or \
+           header.get("hash", None) != file_hash(netfile):
+            return None
+        data = np.load(get_data_path(netfile, header["hash"]), mmap_mode="r",
+                       allow_pickle=False)
+        if data.ndim != 1 or data.dtype != np.float64 or len(data) != header["size"]:
+            return None
+        return _decode(header, data)
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def save_network_metadata(netfile: str, metadata: Dict[str, Any]) -> None:
+    """Save the metadata derived from the given net-file next to it. Both files are
+       written to temporary files first and then moved into place (the data before the
+       header), so concurrent readers (e.g., other rollout workers) never see a
+       partially written cache.
+
+    Args:
+        netfile (str): Path to the SUMO *.net.xml file.
+        metadata (Dict[str, Any]): The metadata to cache.
+    """
+    path = get_cache_path(netfile)
+    net_hash = file_hash(netfile)
+    data_path = get_data_path(netfile, net_hash)
+    header, data = _encode(metadata)
+    header.update({"version": CACHE_VERSION, "hash": net_hash, "size": len(data)})
+    try:
+        _write_atomic(data_path, lambda f: np.save(f, data, allow_pickle=False))
+        _write_atomic(path, lambda f: f.write(json.dumps(header).encode("utf-8")))
+    except OSError as err:
+        warnings.warn(f"Could not write the net-file cache '{path}': {err}")
+        return
+
+    # Data files of earlier versions of the net-file are no longer referenced.
+    for stale_path in glob.glob(glob.escape(netfile + CACHE_SUFFIX) + ".*.npy"):
+        if stale_path != data_path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+
+
+def _write_atomic(path: str, write: Any) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    suffix=CACHE_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+
+def _encode(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], np.ndarray]:
+    # Every array is appended to a single float64 buffer; the header stores the
+    # `[offset, length]` slice of each of them.
+    chunks: List[np.ndarray] = []
+    size = 0
+
+    def add(array: Any) -> List[int]:
+        nonlocal size
+        array = np.asarray(array, dtype=np.float64).ravel()
+        chunks.append(array)
+        size += len(array)
+        return [size - len(array), len(array)]
+
+    trafficlights = {}
+    for tls_id, tls in metadata["trafficlights"].items():
+        program = list(tls["program"])
+        lane_table = tls["lane_table"]
+        trafficlights[tls_id] = {
+            "program": program,
+            "phase_stats": add([tls["phase_stats"][phase] for phase in program]),
+            "lanes": None if lane_table is None else list(lane_table.lanes),
+            "lengths": None if lane_table is None else add(lane_table.lengths),
+            "max_speeds": None if lane_table is None else add(lane_table.max_speeds),
+        }
+    header = {
+        "ids": list(metadata["ids"]),
+        "trafficlights": trafficlights,
+        "graph_indptr": add(metadata["graph_indptr"]),
+        "graph_indices": add(metadata["graph_indices"]),
+    }
+    data = np.concatenate(chunks) if chunks else np.zeros(0)
+    return header, data
+
+
+def _decode(header: Dict[str, Any], data: np.ndarray) -> Dict[str, Any]:
+    def get(span: List[int]) -> np.ndarray:
+        offset, length = span
+        if offset < 0 or offset + length > len(data):
+            raise IndexError("Array slice out of the cache's bounds.")
+        return data[offset:offset+length]
+
+    trafficlights = {}
+    for tls_id, tls in header["trafficlights"].items():
+        program = tls["program"]
+        phase_stats = get(tls["phase_stats"]).reshape(len(program), 2)
+        lane_table = None
+        if tls["lanes"] is not None:
+            lengths = get(tls["lengths"])
+            lane_table = LaneTable(tuple(tls["lanes"]), lengths, get(tls["max_speeds"]),
+                                   float(lengths.sum()))
+        trafficlights[tls_id] = {
+            "program": program,
+            "phase_stats": {phase: (float(mode), float(std))
+                            for phase, (mode, std) in zip(program, phase_stats)},
+            "lane_table": lane_table,
+        }
+
+    ids = header["ids"]
+    indptr = get(header["graph_indptr"]).astype(int)
+    indices = get(header["graph_indices"]).astype(int)
+    return {
+        "ids": ids,
+        "trafficlights": trafficlights,
+        "tls_graph": {tls_id: [ids[j] for j in indices[indptr[i]:indptr[i+1]]]
+                      for i, tls_id in enumerate(ids)},
+        "graph_indptr": indptr,
+        "graph_indices": indices,
+    }
@@ -1,15 +1,32 @@
 import numpy as np
 import time
-import traci
+import traci.constants as tc
 import warnings
 import xml.etree.ElementTree as ET
 
-from typing import Any, Dict, List, Tuple, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Tuple, Union
 
+from seal.sumo.config import (DEFAULT_BACKEND, DEFAULT_NET_CACHE, DEFAULT_PROFILE,
+                              DEFAULT_SUBSCRIBE)
+from seal.sumo.kernel.backend import make_backend
 from seal.sumo.kernel.trafficlight.hub import TrafficLightHub
+from seal.sumo.profiler import CountingBackend, StepProfiler
 
 SORT_DEFAULT = True
 VERBOSE_DEFAULT = 0
+SIMULATION_VARS = [tc.VAR_TIME, tc.VAR_MIN_EXPECTED_VEHICLES,
+                   tc.VAR_DEPARTED_VEHICLES_NUMBER, tc.VAR_ARRIVED_VEHICLES_NUMBER]
+
+
+class SimulationState(NamedTuple):
+    """Simulation-level values of the current step, delivered by a subscription along
+       with the step itself (see `SumoKernel.sim_state`).
+    """
+    time: float                 # Simulation time (in seconds).
+    min_expected_vehicles: int  # Vehicles in the network or still waiting to depart.
+    departed: int               # Vehicles that departed in the last step.
+    arrived: int                # Vehicles that arrived in the last step.
 
 
 class SumoKernel():
@@ -35,9 +52,26 @@ class SumoKernel():
             "additional-files": config.get("additional-files", None),
             "tripinfo-output": config.get("tripinfo-output", None),
         }
+        # NOTE: Kept out of `self.config` since every entry there is passed to SUMO as
+        #       a command-line argument.
+        self.backend = make_backend(config.get("backend", DEFAULT_BACKEND),
+                                    gui=self.config["gui"])
+        # When profiling, every call made through the backend (including those of the
+        # trafficlights, which share it) is counted.
+        self.profiler = StepProfiler(enabled=config.get("profile", DEFAULT_PROFILE))
+        if self.profiler.enabled:
+            self.backend = CountingBackend(self.backend, self.profiler.traci_calls)
+        self.subscribe = config.get("subscribe", DEFAULT_SUBSCRIBE)
+        self.__started_route_files = None
+        self.sim_state: SimulationState = None
+        # Dedicated I/O thread (created on first use) for `step_async()`.
+        self.__io_executor: ThreadPoolExecutor = None
+        self.__pending_step: Future = None
         self.tls_hub = TrafficLightHub(
             self.config["net-file"], 
-            ranked=config.get("ranked", True)
+            ranked=config.get("ranked", True),
+            backend=self.backend,
+            use_cache=config.get("net_cache", DEFAULT_NET_CACHE)
         )
 
 
@@ -46,7 +80,7 @@ class SumoKernel():
         verbose=VERBOSE_DEFAULT,
         no_step_log: bool=True
     ) -> List[str]:
-        """This generates a list of strings that are used by the TraCI API to start a
+        """This generates a list of strings that are used by the SUMO backend to start a
            SUMO simulation given the provided parameters that are stored in the `config`
            dict object.
 
@@ -102,42 +136,145 @@ class SumoKernel():
         bool
             Returns True if a connection is loaded, False otherwise.
         """
-        try:
-            traci.getConnection("")
-            return True
-        except:
-            return False
+        return self.backend.is_loaded()
 
 
     def close(self) -> None:
-        """Closes the SUMO simulation through TraCI if one is up and running."""
+        """Closes the SUMO simulation through the backend if one is up and running."""
+        self.wait()
         if self.is_loaded():
-            traci.close()
+            self.backend.close()
+        self.sim_state = None
+        if self.__io_executor is not None:
+            self.__io_executor.shutdown(wait=True)
+            self.__io_executor = None
 
 
     def done(self) -> bool:
         """Returns whether or not the simulation handled by this Kernel instance is
            finished or not. This is decided if there are still some number of expected
-           vehicles that have yet to complete their routes.
+           vehicles that have yet to complete their routes (read from the cached
+           `sim_state`, so this does not cost a call to SUMO).
 
         Returns
         -------
         bool
             Returns True if the simulation is done, False otherwise.
         """
-        return not traci.simulation.getMinExpectedNumber() > 0
+        if self.sim_state is None:
+            return not self.backend.simulation.getMinExpectedNumber() > 0
+        return not self.sim_state.min_expected_vehicles > 0
 
 
-    def start(self) -> None:
+    def start(self, load_state: str=None) -> None:
         """Starts or resets the simulation based on whether or not it has been started
-           or not.
+           or not. The static lane tables are built on the first load (and only rebuilt
+           if the net-file changes). If subscriptions are enabled, they are
+           (re)established here since loading a simulation drops all subscriptions.
+
+        Parameters
+        ----------
+        load_state : str, optional
+            A simulation state file (see `save_state()`) to start the simulation from
+            rather than from time zero, by default None.
         """
+        self.wait()
+        command_args = self.get_command_args()
+        if load_state is not None:
+            command_args.extend(["--load-state", load_state])
         if self.is_loaded():
-            traci.load(self.get_command_args()[1:])
+            self.backend.load(command_args[1:])
+        else:
+            self.backend.start(command_args)
+        self.__started_route_files = self.config["route-files"]
+        self.tls_hub.build_lane_tables()
+        if load_state is not None:
+            self.tls_hub.update()
+        self.__subscribe()
+
+
+    def save_state(self, statefile: str) -> None:
+        """Saves the current state of the simulation (i.e., its time, vehicles, and
+           trafficlight phases) with SUMO's `saveState`.
+
+        Parameters
+        ----------
+        statefile : str
+            Path of the state file to write.
+        """
+        self.wait()
+        self.backend.simulation.saveState(statefile)
+
+
+    def load_state(self, statefile: str) -> None:
+        """Restores a simulation state saved by `save_state()`. If the running simulation
+           was started with the current route files, the state is restored in place with
+           SUMO's `loadState` (so SUMO does not re-read the net or routes); otherwise, the
+           simulation is reloaded from the state file (i.e., with `--load-state`).
+
+        Parameters
+        ----------
+        statefile : str
+            Path of the state file to restore.
+        """
+        self.wait()
+        if self.is_loaded() and self.__started_route_files == self.config["route-files"]:
+            self.backend.simulation.loadState(statefile)
+            self.tls_hub.update()
+            self.__subscribe()
         else:
-            traci.start(self.get_command_args())
+            self.start(load_state=statefile)
 
 
     def step(self) -> None:
         """Iterates the simulation to the next simulation step."""
-        traci.simulationStep()
+        self.wait()
+        self.__step()
+
+
+    def step_async(self) -> None:
+        """Starts the next simulation step on the kernel's I/O thread and returns right
+           away, so the caller can do work that does not talk to SUMO (e.g., computing
+           ranks and rewards) while SUMO simulates. The step must be awaited with `wait()`
+           before the simulation is used again (every kernel method that talks to SUMO
+           does so itself, but calls made directly through `backend` or `tls_hub` do not).
+        """
+        self.wait()
+        if self.__io_executor is None:
+            self.__io_executor = ThreadPoolExecutor(max_workers=1,
+                                                    thread_name_prefix="seal-traci")
+        self.__pending_step = self.__io_executor.submit(self.__step)
+
+
+    def wait(self) -> None:
+        """Waits for the simulation step started by `step_async()` (if any) to finish,
+           re-raising any error it raised."""
+        if self.__pending_step is not None:
+            pending_step, self.__pending_step = self.__pending_step, None
+            pending_step.result()
+
+
+    def __step(self) -> None:
+        with self.profiler.section("simulate"):
+            self.backend.simulation_step()
+            self.__update_sim_state()
+
+
+    def __subscribe(self) -> None:
+        # The simulation-level values are always subscribed to (they cost nothing extra
+        # since they come with the response of each step); the trafficlights' lanes and
+        # states only if subscriptions are enabled.
+        self.backend.simulation.subscribe(SIMULATION_VARS)
+        self.__update_sim_state()
+        if self.subscribe:
+            self.tls_hub.subscribe()
+
+
+    def __update_sim_state(self) -> None:
+        results = self.backend.simulation.getSubscriptionResults()
+        self.sim_state = SimulationState(
+            time=results[tc.VAR_TIME],
+            min_expected_vehicles=results[tc.VAR_MIN_EXPECTED_VEHICLES],
+            departed=results[tc.VAR_DEPARTED_VEHICLES_NUMBER],
+            arrived=results[tc.VAR_ARRIVED_VEHICLES_NUMBER],
+        )
@@ -0,0 +1,83 @@
+import xml.etree.ElementTree as ET
+
+from typing import Dict, List, Tuple
+
+TRAFFIC_LIGHT_JUNCTION = "traffic_light"
+INTERNAL_EDGE = "internal"
+
+
+class ParsedNetwork:
+    """The parts of a SUMO *.net.xml file that are needed to build the trafficlights of a
+       simulation. The file is walked exactly once with `iterparse`, and each element is
+       dropped once it has been read, so memory stays low even for large road networks.
+       The `TrafficLightHub` and each of its `TrafficLight` objects read from a single
+       instance of this class rather than re-parsing the file themselves.
+    """
+
+    netfile: str
+    junctions: Dict[str, str]
+    edges: Dict[str, Tuple[str, str]]
+    lanes: Dict[str, Tuple[float, float]]
+    programs: Dict[str, List[str]]
+    controlled_lanes: Dict[str, List[str]]
+
+    def __init__(self, netfile: str) -> None:
+        """Parse the given net-file.
+
+        Args:
+            netfile (str): Path to the SUMO *.net.xml file.
+        """
+        self.netfile = netfile
+        self.junctions = {}  # Junction ID => junction type.
+        self.edges = {}      # (Non-internal) edge ID => (from junction, to junction).
+        self.lanes = {}      # Lane ID => (length, max speed).
+        self.programs = {}   # Trafficlight ID => phase states of its first program.
+        self.controlled_lanes = {}  # Trafficlight ID => incoming lane of each link.
+        self.__parse()
+
+    @property
+    def traffic_light_ids(self) -> List[str]:
+        """List of the IDs of all the traffic light junctions in the network."""
+        return [junction_id for junction_id, junction_type in self.junctions.items()
+                if junction_type == TRAFFIC_LIGHT_JUNCTION]
+
+    def __parse(self) -> None:
+        root, depth = None, 0
+        links = {}  # Trafficlight ID => {link index => incoming lane ID}.
+        for event, elem in ET.iterparse(self.netfile, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+
+            if elem.tag == "junction":
+                self.junctions[elem.attrib["id"]] = elem.attrib.get("type", None)
+            elif elem.tag == "edge":
+                for lane in elem.iter("lane"):
+                    self.lanes[lane.attrib["id"]] = (
+                        float(lane.attrib.get("length", 0.0)),
+                        float(lane.attrib.get("speed", 0.0))
+                    )
+                if elem.attrib.get("function", None) != INTERNAL_EDGE:
+                    self.edges[elem.attrib["id"]] = (elem.attrib.get("from", None),
+                                                     elem.attrib.get("to", None))
+            elif elem.tag == "tlLogic":
+                # Only the first program of a trafficlight is kept.
+                self.programs.setdefault(
+                    elem.attrib["id"],
+                    [phase.attrib["state"] for phase in elem.iter("phase")]
+                )
+            elif elem.tag == "connection" and "tl" in elem.attrib:
+                lane_id = f"{elem.attrib['from']}_{elem.attrib['fromLane']}"
+                links.setdefault(elem.attrib["tl"], {})[
+                    int(elem.attrib["linkIndex"])] = lane_id
+
+            # Drop every top-level element (and its children) once it has been read.
+            if depth == 1:
+                root.clear()
+
+        # Order the controlled lanes by link index (as TraCI's `getControlledLanes` does).
+        for tls_id, tls_links in links.items():
+            self.controlled_lanes[tls_id] = [tls_links[i] for i in sorted(tls_links)]
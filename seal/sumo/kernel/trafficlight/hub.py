@@ -1,9 +1,7 @@
 import networkx as nx
 import numpy as np
 import random
-import traci
 import warnings
-import xml.etree.ElementTree as ET
 
 from collections import OrderedDict
 from gym import spaces
@@ -11,7 +9,10 @@ from typing import Any, Dict, List, Set, Tuple, Union
 
 from seal.sumo.utils.core import get_node_id
 from seal.sumo.config import *
+from seal.sumo.kernel.backend import SumoBackend, make_backend
+from seal.sumo.kernel.cache import load_network_metadata, save_network_metadata
 from seal.sumo.kernel.const import *
+from seal.sumo.kernel.net import ParsedNetwork
 from seal.sumo.kernel.trafficlight.light import TrafficLight
 
 
@@ -26,21 +27,67 @@ class TrafficLightHub:
         self,
         road_netfile: str,
         sort_phases: bool=SORT_DEFAULT,
-        ranked: bool=RANK_DEFAULT
+        ranked: bool=RANK_DEFAULT,
+        backend: SumoBackend=None,
+        net: ParsedNetwork=None,
+        use_cache: bool=DEFAULT_NET_CACHE
     ) -> None:
         self.road_netfile = road_netfile
-        self.ids = sorted([tls_id for tls_id in self.get_traffic_light_ids()])
+        # Every trafficlight shares the hub's backend. A hub created on its own (i.e.,
+        # without a backend) gets a TraCI backend that the caller has to start.
+        self.backend = make_backend() if backend is None else backend
+
+        # Load the metadata derived from the net-file from its on-disk cache (if it is
+        # valid). Otherwise, the net-file is parsed and the cache is (re)written.
+        metadata = None
+        if net is None and use_cache:
+            metadata = load_network_metadata(road_netfile)
+        if metadata is None:
+            self.net = ParsedNetwork(road_netfile) if net is None else net
+            self.ids = sorted([tls_id for tls_id in self.get_traffic_light_ids()])
+        else:
+            self.net = None
+            self.ids = metadata["ids"]
+
         self.index2id = {index:  tls_id for index,
                          tls_id in enumerate(self.ids)}
         self.id2index = {tls_id: index for index,
                          tls_id in enumerate(self.ids)}
         self.hub = OrderedDict({
-            tls_id: TrafficLight(index, tls_id, self.road_netfile, sort_phases,
-                                 ranked=ranked)
+            tls_id: TrafficLight(index, tls_id, self.road_netfile, self.backend,
+                                 sort_phases, ranked=ranked, net=self.net,
+                                 metadata=None if metadata is None
+                                 else metadata["trafficlights"][tls_id])
             for index, tls_id in self.index2id.items()
         })
         self.ranked = ranked
-        self.tls_graph = self.get_tls_graph()
+
+        if metadata is None:
+            self.tls_graph = self.get_tls_graph()
+            self.graph_indptr, self.graph_indices = self.get_tls_csr()
+            if use_cache:
+                save_network_metadata(road_netfile, self.get_metadata())
+        else:
+            self.tls_graph = metadata["tls_graph"]
+            self.graph_indptr = metadata["graph_indptr"]
+            self.graph_indices = metadata["graph_indices"]
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """Get the static data derived from the net-file (trafficlight IDs, programs,
+           phase statistics, lane tables, and the adjacency graph) to be cached.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The hub's static data.
+        """
+        return {
+            "ids": self.ids,
+            "trafficlights": {tls.id: tls.metadata for tls in self.hub.values()},
+            "tls_graph": self.tls_graph,
+            "graph_indptr": self.graph_indptr,
+            "graph_indices": self.graph_indices,
+        }
 
     def get_traffic_light_ids(self) -> List[str]:
         """Get a list of all the traffic light IDs in the provided *.net.xml file.
@@ -50,32 +97,91 @@ class TrafficLightHub:
         List[str]
             A list of all the traffic light IDs.
         """
-        with open(self.road_netfile, "r") as f:
-            tree = ET.parse(f)
-            junctions = tree.findall("junction")
-            trafficlights = []
-            for j in junctions:
-                if j.attrib["type"] == "traffic_light":
-                    trafficlights.append(j.attrib["id"])
-            return trafficlights
+        return self.net.traffic_light_ids
 
     def get_tls_graph(self) -> Dict[str, List[str]]:
-        graph = {}
-        tls_id_set = set(self.ids)
-        with open(self.road_netfile, "r") as f:
-            tree = ET.parse(f)
-            edges = tree.findall("edge")
-            for tls_id in tls_id_set:
-                neighbors = set()
-                other_tls_id_set = tls_id_set - {tls_id}
-                for e in edges:
-                    for other_tls_id in other_tls_id_set:
-                        cond = e.attrib.get("from", None) == tls_id and \
-                            e.attrib.get("to",   None) == other_tls_id
-                        if cond:
-                            neighbors.add(other_tls_id)
-                graph[tls_id] = list(neighbors)
-        return graph
+        """Get the adjacency list of the trafficlights, where trafficlight `a` neighbors
+           trafficlight `b` if an edge goes directly from `a` to `b`. This is built in a
+           single pass over the edges of the road network.
+
+        Returns
+        -------
+        Dict[str, List[str]]
+            The neighbors of each trafficlight (sorted by trafficlight index).
+        """
+        neighbors = {tls_id: set() for tls_id in self.ids}
+        for (from_id, to_id) in self.net.edges.values():
+            if from_id in neighbors and to_id in neighbors and from_id != to_id:
+                neighbors[from_id].add(to_id)
+        return {tls_id: sorted(neighbors[tls_id], key=self.id2index.get)
+                for tls_id in self.ids}
+
+    def get_tls_csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the trafficlight graph (see `get_tls_graph()`) in compressed sparse row
+           (CSR) form using trafficlight indices (see `id2index`). The neighbors of the
+           trafficlight with index `i` are `indices[indptr[i]:indptr[i+1]]`.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The `indptr` and `indices` arrays of the CSR adjacency structure.
+        """
+        degrees = [len(self.tls_graph[tls_id]) for tls_id in self.ids]
+        indptr = np.zeros(len(self.ids) + 1, dtype=int)
+        indptr[1:] = np.cumsum(degrees)
+        indices = np.array([self.id2index[neighbor]
+                            for tls_id in self.ids
+                            for neighbor in self.tls_graph[tls_id]], dtype=int)
+        return indptr, indices
+
+    def rank_matrix(self, obs_matrix: np.ndarray, occupancy: np.ndarray=None) -> None:
+        """Computes the global and local ranks over a (n_trafficlights, n_features)
+           observation matrix (rows ordered by trafficlight index) in an inplace fashion.
+           The global rank of a trafficlight is based on its lane occupancy across the
+           whole road network (ties keep index order), and its local rank on how many
+           of its neighbors it outranks.
+
+        Parameters
+        ----------
+        obs_matrix : np.ndarray
+            Observations of all the trafficlights.
+        occupancy : np.ndarray, optional
+            The lane occupancy of each trafficlight to rank by, by default None (i.e.,
+            the `LANE_OCCUPANCY` column of `obs_matrix`). Pass the float64 values when
+            `obs_matrix` is float32, since occupancies that only differ beyond float32
+            precision would otherwise tie.
+        """
+        n_tls = len(obs_matrix)
+        if occupancy is None:
+            occupancy = obs_matrix[:, LANE_OCCUPANCY]
+
+        # Calculate the GLOBAL ranks for each tls in the road network. A stable sort on
+        # the negated occupancies ranks in descending order while keeping ties in index
+        # order.
+        order = np.argsort(-occupancy, kind="stable")
+        global_rank = np.empty(n_tls, dtype=int)
+        global_rank[order] = np.arange(n_tls)
+        if n_tls > 1:
+            obs_matrix[:, GLOBAL_RANK] = 1 - (global_rank / (n_tls-1))
+        else:
+            obs_matrix[:, GLOBAL_RANK] = 1
+
+        # Calculate LOCAL ranks based on global ranks from above. For each (tls,
+        # neighbor) pair of the CSR adjacency, check whether the tls outranks its
+        # neighbor (i.e., has a smaller global rank index) and then count these per tls.
+        degree = np.diff(self.graph_indptr)
+        rows = np.repeat(np.arange(n_tls), degree)
+        outranks = global_rank[rows] < global_rank[self.graph_indices]
+        local_rank = np.bincount(rows, weights=outranks, minlength=n_tls)
+        # We do *not* subtract the denominator by 1 (as we do with global rank) because
+        # `degree` does not include the tls itself as a node in the sub-network when it
+        # should be included. This means that +1 node cancels out the -1 node.
+        # Trafficlights without neighbors get a local rank of 1.
+        obs_matrix[:, LOCAL_RANK] = np.where(
+            degree > 0,
+            1 - (local_rank / np.maximum(degree, 1)),
+            1
+        )
 
     def update(self) -> None:
         """Update the current states by interfacing with SUMO directly using SumoKernel.
@@ -83,6 +189,20 @@ class TrafficLightHub:
         for tls in self.hub.values():
             tls.update()
 
+    def build_lane_tables(self) -> None:
+        """Build the static lane table of each trafficlight (see
+           `TrafficLight.build_lane_table()`).
+        """
+        for tls in self.hub.values():
+            tls.build_lane_table()
+
+    def subscribe(self) -> None:
+        """Set up the TraCI subscriptions of each trafficlight (see
+           `TrafficLight.subscribe()`).
+        """
+        for tls in self.hub.values():
+            tls.subscribe()
+
     def __iter__(self) -> iter:
         return iter(self.hub.values())
 
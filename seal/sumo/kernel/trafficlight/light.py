@@ -1,18 +1,44 @@
 import networkx as nx
 import numpy as np
+import os
 import random
-import traci
-import xml.etree.ElementTree as ET
+import traci.constants as tc
 
 from gym import spaces
-from scipy import stats
-from typing import List
+from typing import Any, Dict, List, NamedTuple, Tuple
 
 from seal.sumo.config import *
+from seal.sumo.kernel.backend import SumoBackend
 from seal.sumo.kernel.const import *
+from seal.sumo.kernel.net import ParsedNetwork
 from seal.sumo.kernel.trafficlight.space import trafficlight_space
 
 
+class LaneTable(NamedTuple):
+    """Static geometry of the (deduplicated) lanes controlled by a trafficlight."""
+    lanes: Tuple[str, ...]
+    lengths: np.ndarray
+    max_speeds: np.ndarray
+    total_length: float
+
+
+def get_phase_stats(phase: str) -> Tuple[float, float]:
+    """Compute the normalized mode and standard deviation of the light states in a RYG
+       phase string (e.g., "GGrryy"). Ties for the mode go to the smallest state value.
+
+    Args:
+        phase (str): The RYG phase string.
+
+    Returns:
+        Tuple[float, float]: The phase state mode and std, each divided by the number of
+            possible light states.
+    """
+    arr = np.fromiter((STATE_STR_TO_INT[light] for light in phase), dtype=int,
+                      count=len(phase))
+    mode = np.bincount(arr, minlength=NUM_TLS_STATES).argmax()
+    return mode / NUM_TLS_STATES, arr.std() / NUM_TLS_STATES
+
+
 class TrafficLight:
     """This class represents an indidivual `trafficlight` (tls) in SUMO. The purpose is to
        simplify the necessary code for the needs of the RL environments in seal.
@@ -25,26 +51,48 @@ class TrafficLight:
     state: int
     phase: str
     ranked: bool
+    subscribed: bool
+    backend: SumoBackend
+    lane_table: LaneTable
+    phase_stats: np.ndarray
+    metadata: Dict[str, Any]
 
     def __init__(
         self,
         index: int,
         tls_id: int,
         netfile: str,
+        backend: SumoBackend,
         sort_phases: bool=SORT_DEFAULT,
         force_all_red: bool=False,
-        ranked: bool=True
+        ranked: bool=True,
+        net: ParsedNetwork=None,
+        metadata: Dict[str, Any]=None
     ):
         # The `index` data member is for the consistently simple indexing for actions
         # that are represented via lists. This is important for the `stable-baselines`
         # implementation that does not support Dict spaces.
         self.index = index
         self.id = tls_id
-        self.program = self.get_program(netfile, sort_phases, force_all_red)
+        self.netfile = netfile
+        if metadata is None:
+            metadata = self.get_metadata(ParsedNetwork(netfile) if net is None else net)
+        self.metadata = metadata
+        self.program = self.get_program(metadata["program"], sort_phases, force_all_red)
         self.num_phases = len(self.program)
+        self.phase_stats = np.array([metadata["phase_stats"].get(p, None) or
+                                     get_phase_stats(p) for p in self.program])
+        self.__phase_index = {}
+        for state, phase in enumerate(self.program):
+            self.__phase_index.setdefault(phase, state)
         self.state = random.randrange(self.num_phases)
         self.phase = self.program[self.state]
         self.ranked = ranked
+        self.subscribed = False
+        self.backend = backend
+        self.lane_table = metadata["lane_table"]
+        self.__lane_table_key = self.__get_netfile_key() \
+            if self.lane_table is not None else None
 
     @property
     def action_space(self) -> spaces.Box:
@@ -55,12 +103,15 @@ class TrafficLight:
         return trafficlight_space(self.ranked)
 
     def update(self) -> None:
-        """Update the current state by interacting with `traci`."""
+        """Update the current state by interacting with the SUMO backend."""
         try:
-            self.phase = traci.trafficlight.getRedYellowGreenState(self.id)
-            self.state = self.program.index(self.phase)
-        except traci.exceptions.FatalTraCIError:
-            pass
+            phase = self.backend.trafficlight.getRedYellowGreenState(self.id)
+            state = self.program.index(phase)
+        except (self.backend.FatalError, ValueError):
+            # NOTE: A restored simulation state may be in a phase outside of the program,
+            #       in which case `phase` and `state` are both left as they were.
+            return
+        self.phase, self.state = phase, state
 
     def next_phase(self) -> None:
         next_state = (self.state+1) % self.num_phases
@@ -68,13 +119,40 @@ class TrafficLight:
         try:
             self.state = next_state
             self.phase = next_phase
-            traci.trafficlight.setRedYellowGreenState(self.id, self.phase)
-        except traci.exceptions.FatalTraCIError:
+            self.backend.trafficlight.setRedYellowGreenState(self.id, self.phase)
+        except self.backend.FatalError:
             pass
 
+    def get_metadata(self, net: ParsedNetwork) -> Dict[str, Any]:
+        """Derive the static data this trafficlight needs from the parsed road network:
+           its (unsorted) program, the phase statistics of each of its phases, and its
+           lane table. This is what the `TrafficLightHub` stores in the net-file cache.
+
+        Args:
+            net (ParsedNetwork): The parsed road network the traffic light is part of.
+
+        Returns:
+            Dict[str, Any]: The trafficlight's static data.
+        """
+        program = list(net.programs[self.id])
+        lane_table = None
+        controlled = net.controlled_lanes.get(self.id, None)
+        if controlled and all(l in net.lanes for l in controlled):
+            lanes = tuple(dict.fromkeys(controlled))
+            lane_table = self.__make_lane_table(
+                lanes,
+                [net.lanes[l][0] for l in lanes],
+                [net.lanes[l][1] for l in lanes]
+            )
+        return {
+            "program": program,
+            "phase_stats": {phase: get_phase_stats(phase) for phase in program},
+            "lane_table": lane_table,
+        }
+
     def get_program(
         self,
-        road_netfile: str,
+        states: List[str],
         sort_phases: bool=SORT_DEFAULT,
         force_all_red: bool=False
     ) -> List[str]:
@@ -82,7 +160,7 @@ class TrafficLight:
            given `tls_id`.
 
         Args:
-            road_netfile (str): The traffic light id.
+            states (List[str]): The phases of the traffic light's program in the net-file.
             sort_phases (bool, optional): Sorts the possible phases if True. Defaults to
                 SORT_DEFAULT.
             force_all_red (bool, optional): Requires there's a state of all red lights if
@@ -91,36 +169,92 @@ class TrafficLight:
         Returns:
             List[str]: A list of all the possible phases the given traffic light can take.
         """
-        with open(road_netfile, "r") as f:
-            tree = ET.parse(f)
-            logic = tree.find(f"tlLogic[@id='{self.id}']")
-            states = [phase.attrib["state"] for phase in logic]
+        states = list(states)
+
+        if force_all_red:
+            all_reds = len(states[0]) * "r"
+            if all_reds not in states:
+                states.append(all_reds)
+
+        return states if (sort_phases == False) else sorted(states)
+
+    def build_lane_table(self) -> None:
+        """Build the table of static lane geometry (lane ids, lengths, and max speeds)
+           for the lanes controlled by this trafficlight. TraCI reports a lane once per
+           link it controls, so lanes are deduplicated (keeping their first occurrence).
+           The table is usually already derived from the net-file (see `get_metadata()`)
+           and is only rebuilt through the backend if the net-file has changed since, so
+           this is cheap to call on every (re)load of the simulation.
+        """
+        key = self.__get_netfile_key()
+        if self.lane_table is not None and key == self.__lane_table_key:
+            return
+
+        controlled = self.backend.trafficlight.getControlledLanes(self.id)
+        lanes = tuple(dict.fromkeys(controlled))
+        self.lane_table = self.__make_lane_table(
+            lanes,
+            [self.backend.lane.getLength(l) for l in lanes],
+            [self.backend.lane.getMaxSpeed(l) for l in lanes]
+        )
+        self.__lane_table_key = key
+
+    def __make_lane_table(
+        self,
+        lanes: Tuple[str, ...],
+        lengths: List[float],
+        max_speeds: List[float]
+    ) -> LaneTable:
+        lengths = np.array(lengths, dtype=float)
+        max_speeds = np.array(max_speeds, dtype=float)
+        return LaneTable(lanes, lengths, max_speeds, float(lengths.sum()))
+
+    def __get_netfile_key(self) -> Tuple[str, int, int]:
+        stat = os.stat(self.netfile)
+        return (os.path.abspath(self.netfile), stat.st_mtime_ns, stat.st_size)
+
+    def subscribe(self) -> None:
+        """Set up the TraCI subscriptions used to build observations. Each controlled
+           lane gets a context subscription for the speed, length, and lane of the
+           vehicles on it, and the trafficlight itself is subscribed to its current
+           RYG state. The results are then delivered in bulk by every simulation step.
+           This needs to be called after each (re)load of the simulation because SUMO
+           drops all subscriptions when a new simulation is loaded.
+        """
+        self.build_lane_table()
+        for l in self.lane_table.lanes:
+            self.backend.lane.subscribeContext(
+                l, tc.CMD_GET_VEHICLE_VARIABLE, CONTEXT_RANGE,
+                [tc.VAR_SPEED, tc.VAR_LENGTH, tc.VAR_LANE_ID]
+            )
+        self.backend.trafficlight.subscribe(self.id, [tc.TL_RED_YELLOW_GREEN_STATE])
+        self.subscribed = True
 
-            if force_all_red:
-                all_reds = len(states[0]) * "r"
-                if all_reds not in states:
-                    states.append(all_reds)
+    def get_observation(self, out: np.ndarray=None) -> np.ndarray:
+        """Get the observation of this trafficlight for the current simulation step.
 
-            return states if (sort_phases == False) else sorted(states)
+        Args:
+            out (np.ndarray, optional): Array of length `n_features` (e.g., a row of the
+                env's observation matrix) to write the observation into in place. A new
+                array is allocated if None. Defaults to None.
 
-    def get_observation(self) -> np.ndarray:
-        # Initialize the observation list (obs).
+        Returns:
+            np.ndarray: The observation (i.e., `out` if it was provided).
+        """
+        # Initialize the observation array (obs).
         n_features = N_RANKED_FEATURES if self.ranked else N_UNRANKED_FEATURES
-        obs = [0 for _ in range(n_features)]
+        obs = np.zeros(n_features) if out is None else out
 
         # Extract the lane-specific features.
-        max_lane_speeds = vehicle_speeds = 0
-        total_lane_length = vehicle_lengths = halted_vehicle_lengths = 0
-        for l in traci.trafficlight.getControlledLanes(self.id):
-            total_lane_length += traci.lane.getLength(l)
-            max_speed = traci.lane.getMaxSpeed(l)
-            for v in traci.lane.getLastStepVehicleIDs(l):
-                speed = traci.vehicle.getSpeed(v)
-                vehicle_speeds += speed
-                max_lane_speeds += max_speed
-                vehicle_lengths += traci.vehicle.getLength(v)
-                if speed < HALTING_SPEED:
-                    halted_vehicle_lengths += traci.vehicle.getLength(v)
+        if self.lane_table is None:
+            self.build_lane_table()
+        total_lane_length = self.lane_table.total_length
+        if self.subscribed:
+            vehicle_lengths, halted_vehicle_lengths, vehicle_speeds, \
+                max_lane_speeds = self.__lane_features_subscribed()
+        else:
+            vehicle_lengths, halted_vehicle_lengths, vehicle_speeds, \
+                max_lane_speeds = self.__lane_features_polled()
 
         obs[LANE_OCCUPANCY] = vehicle_lengths / total_lane_length
         obs[HALTED_LANE_OCCUPANCY] = halted_vehicle_lengths / total_lane_length
@@ -133,14 +267,72 @@ class TrafficLight:
             obs[SPEED_RATIO] = 0.0
 
         # Extract descriptive statistics features for the current traffic light state.
-        curr_tls_state = traci.trafficlight.getRedYellowGreenState(self.id)
-        curr_tls_state_arr = [STATE_STR_TO_INT[phase]
-                              for phase in curr_tls_state]
-        obs[PHASE_STATE_MODE] = stats.mode(curr_tls_state_arr)[
-            0].item() / NUM_TLS_STATES
-        obs[PHASE_STATE_STD] = np.std(curr_tls_state_arr) / NUM_TLS_STATES
-
-        return np.array(obs)
+        if self.subscribed:
+            curr_tls_state = self.backend.trafficlight.getSubscriptionResults(
+                self.id)[tc.TL_RED_YELLOW_GREEN_STATE]
+        else:
+            curr_tls_state = self.backend.trafficlight.getRedYellowGreenState(self.id)
+        obs[PHASE_STATE_MODE], obs[PHASE_STATE_STD] = \
+            self.__get_phase_stats(curr_tls_state)
+
+        return obs
+
+    def __get_phase_stats(self, phase: str) -> Tuple[float, float]:
+        """Look up the phase state mode and std of the given phase in the precomputed
+           `phase_stats` table. The phase string is only parsed if it is not part of
+           this trafficlight's program.
+        """
+        if self.program[self.state] == phase:
+            return self.phase_stats[self.state]
+        state = self.__phase_index.get(phase, None)
+        if state is not None:
+            return self.phase_stats[state]
+        return get_phase_stats(phase)
+
+    def __lane_features_polled(self) -> Tuple[float, float, float, float]:
+        """Sum up the vehicle features by querying TraCI for every lane and vehicle.
+
+        Returns:
+            Tuple[float, float, float, float]: The vehicle lengths, halted vehicle
+                lengths, vehicle speeds, and max lane speeds.
+        """
+        max_lane_speeds = vehicle_speeds = 0
+        vehicle_lengths = halted_vehicle_lengths = 0
+        for l, max_speed in zip(self.lane_table.lanes, self.lane_table.max_speeds):
+            for v in self.backend.lane.getLastStepVehicleIDs(l):
+                speed = self.backend.vehicle.getSpeed(v)
+                length = self.backend.vehicle.getLength(v)
+                vehicle_speeds += speed
+                max_lane_speeds += max_speed
+                vehicle_lengths += length
+                if speed < HALTING_SPEED:
+                    halted_vehicle_lengths += length
+        return vehicle_lengths, halted_vehicle_lengths, vehicle_speeds, max_lane_speeds
+
+    def __lane_features_subscribed(self) -> Tuple[float, float, float, float]:
+        """Sum up the vehicle features from the context subscription results of the last
+           simulation step (see `subscribe()`). No TraCI round trips are made here.
+
+        Returns:
+            Tuple[float, float, float, float]: The vehicle lengths, halted vehicle
+                lengths, vehicle speeds, and max lane speeds.
+        """
+        max_lane_speeds = vehicle_speeds = 0
+        vehicle_lengths = halted_vehicle_lengths = 0
+        for l, max_speed in zip(self.lane_table.lanes, self.lane_table.max_speeds):
+            vehicles = self.backend.lane.getContextSubscriptionResults(l) or {}
+            for v in vehicles.values():
+                # The context range also catches vehicles on neighboring and
+                # connected lanes, so only keep those that are on lane `l`.
+                if v[tc.VAR_LANE_ID] != l:
+                    continue
+                speed = v[tc.VAR_SPEED]
+                vehicle_speeds += speed
+                max_lane_speeds += max_speed
+                vehicle_lengths += v[tc.VAR_LENGTH]
+                if speed < HALTING_SPEED:
+                    halted_vehicle_lengths += v[tc.VAR_LENGTH]
+        return vehicle_lengths, halted_vehicle_lengths, vehicle_speeds, max_lane_speeds
 
     def __get_lane_occupancy(self) -> float:
         pass
@@ -0,0 +1,169 @@
+import numpy as np
+import time
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List
+
+from seal.sumo.kernel.backend import SumoBackend
+
+# Bin edges (in seconds) of the timing histograms: 1 microsecond to 10 seconds.
+HISTOGRAM_BINS = np.geomspace(1e-6, 10.0, num=29)
+DOMAINS = ["trafficlight", "lane", "vehicle", "simulation"]
+# Calls that read the results of subscriptions (e.g., `getContextSubscriptionResults`),
+# which TraCI delivers along with each simulation step. They are local lookups (no round
+# trip to SUMO) and are thus reported apart from the TraCI calls.
+SUBSCRIPTION_READ_SUFFIX = "SubscriptionResults"
+
+
+def is_subscription_read(call: str) -> bool:
+    """Whether the given counted call (e.g., "lane.getContextSubscriptionResults") reads
+       subscription results rather than making a round trip to SUMO."""
+    return call.endswith(SUBSCRIPTION_READ_SUFFIX)
+
+_NULL_SECTION = nullcontext()
+
+
+class StepProfiler:
+    """Records how long each phase of an env step takes (e.g., simulating, observing,
+       ranking) and how many TraCI calls (i.e., round trips to SUMO) are made. Timings are kept per step and, for
+       the current episode, as a history used to build histograms (see `summary()`).
+
+       When disabled, `section()` returns a shared no-op context manager and nothing is
+       recorded, so the instrumented code costs next to nothing.
+    """
+
+    def __init__(self, enabled: bool=False) -> None:
+        self.enabled = enabled
+        self.traci_calls = Counter()
+        self.__step_times: Dict[str, float] = defaultdict(float)
+        self.__history: Dict[str, List[float]] = defaultdict(list)
+        self.__calls_history: List[int] = []
+        self.__reads_history: List[int] = []
+
+    def section(self, name: str):
+        """Context manager timing the code it wraps as the given phase of the current
+           step (nested or repeated sections of the same phase add up).
+
+        Args:
+            name (str): Name of the phase.
+        """
+        if not self.enabled:
+            return _NULL_SECTION
+        return self.__timed(name)
+
+    @contextmanager
+    def __timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__step_times[name] += time.perf_counter() - start
+
+    def end_step(self, is_reset: bool=False) -> Dict[str, Any]:
+        """Close the current step, adding its timings to the episode's history. Any
+           simulation step started by `SumoKernel.step_async()` must be awaited first,
+           since it records its timings and TraCI calls from the kernel's I/O thread.
+
+        Args:
+            is_reset (bool, optional): Whether the "step" was a reset, whose calls are
+                then left out of the per-step means of the summary. Defaults to False.
+
+        Returns:
+            Dict[str, Any]: The duration (in seconds) of each phase of the step, its
+                number of TraCI calls, and its number of subscription result reads
+                (None if disabled).
+        """
+        if not self.enabled:
+            return None
+        record = dict(self.__step_times)
+        reads = sum(n for call, n in self.traci_calls.items()
+                    if is_subscription_read(call))
+        record["traci_calls"] = sum(self.traci_calls.values()) - reads
+        record["subscription_reads"] = reads
+        for name, seconds in self.__step_times.items():
+            self.__history[name].append(seconds)
+        if not is_reset:
+            self.__calls_history.append(record["traci_calls"])
+            self.__reads_history.append(reads)
+        self.__step_times.clear()
+        self.traci_calls.clear()
+        return record
+
+    def reset(self) -> None:
+        """Clear the history (i.e., start a new episode)."""
+        self.__step_times.clear()
+        self.__history.clear()
+        self.__calls_history.clear()
+        self.__reads_history.clear()
+        self.traci_calls.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the steps of the current episode.
+
+        Returns:
+            Dict[str, Any]: For each phase, the number of steps it was recorded in, the
+                mean, median, 95th percentile, and max of its duration (in seconds), and
+                a histogram of its durations (counts over `HISTOGRAM_BINS`), along with
+                the mean number of TraCI calls and subscription result reads per step.
+        """
+        summary = {}
+        for name, seconds in self.__history.items():
+            seconds = np.asarray(seconds)
+            counts, _ = np.histogram(seconds, bins=HISTOGRAM_BINS)
+            summary[name] = {
+                "n": len(seconds),
+                "mean": float(seconds.mean()),
+                "p50": float(np.percentile(seconds, 50)),
+                "p95": float(np.percentile(seconds, 95)),
+                "max": float(seconds.max()),
+                "histogram": counts.tolist(),
+            }
+        if self.__calls_history:
+            summary["traci_calls_per_step"] = float(np.mean(self.__calls_history))
+            summary["subscription_reads_per_step"] = \
+                float(np.mean(self.__reads_history))
+        return summary
+
+
+class CountingDomain:
+    """Wraps a TraCI domain (e.g., `trafficlight`) so that each call is counted (see
+       `is_subscription_read()` for the calls that are not TraCI round trips)."""
+
+    def __init__(self, domain: Any, name: str, counts: Counter) -> None:
+        self.__domain = domain
+        self.__name = name
+        self.__counts = counts
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self.__domain, attr)
+        if not callable(value):
+            return value
+        key = f"{self.__name}.{attr}"
+        counts = self.__counts
+
+        def counted(*args, **kwargs):
+            counts[key] += 1
+            return value(*args, **kwargs)
+        return counted
+
+
+class CountingBackend:
+    """Wraps a `SumoBackend` so that each call made through it (to one of its domains or
+       to `simulation_step()`) is counted in the given counter. It is only used when
+       profiling is enabled.
+    """
+
+    def __init__(self, backend: SumoBackend, counts: Counter) -> None:
+        self.__backend = backend
+        self.__counts = counts
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self.__backend, name)
+        if name in DOMAINS:
+            return CountingDomain(value, name, self.__counts)
+        return value
+
+    def simulation_step(self) -> None:
+        self.__counts["simulationStep"] += 1
+        self.__backend.simulation_step()
@@ -1,5 +1,6 @@
 import numpy as np
 
+from typing import Union
 from seal.sumo.config import MIN_DELAY
 
 '''
@@ -12,7 +13,12 @@ states might have varying delays).
 
 class ActionTimer:
     """Class implements the necessary "timer" mechanism in order to detect whether a
-       trafficlight has sat idle long enough until it can change its light phase.
+       trafficlight has sat idle long enough until it can change its light phase. The
+       timers are kept in a single int array, and `index` arguments can either be a
+       single trafficlight index or anything NumPy accepts as an index (e.g., a boolean
+       mask over all the trafficlights) to update several timers at once. Timers count
+       simulation steps, so `decr()` takes the number of steps that have passed (e.g.,
+       the decision interval of the env).
     """
 
     def __init__(self, n_actions: int, delay: int=MIN_DELAY):
@@ -20,21 +26,22 @@ class ActionTimer:
         self.delay = delay
         self.restart()
 
-    def restart(self, index: int=None) -> None:
+    def restart(self, index: Union[int, np.ndarray]=None) -> None:
         if index is not None:
             self.__timer[index] = self.delay
         else:
-            self.__timer = self.delay * np.ones(shape=(self.__n_actions))
+            self.__timer = np.full(self.__n_actions, self.delay, dtype=int)
 
-    def decr(self, index: int=None) -> None:
+    def decr(self, index: Union[int, np.ndarray]=None, steps: int=1) -> None:
         if index is not None:
-            self.__timer[index] = max(0, self.__timer[index] - 1)
+            self.__timer[index] = np.maximum(0, self.__timer[index] - steps)
         else:
-            for i in range(self.__n_actions):
-                self.__timer[i] = max(0, self.__timer[i] - 1)
+            np.maximum(0, self.__timer - steps, out=self.__timer)
 
-    def can_change(self, index: int) -> bool:
-        return self.__timer[index] == 0
+    def can_change(self, index: Union[int, np.ndarray]=None) -> Union[bool, np.ndarray]:
+        if index is not None:
+            return self.__timer[index] == 0
+        return self.__timer == 0
 
     def __repr__(self) -> str:
         return str(self.__timer)
@@ -1,4 +1,40 @@
+import hashlib
+import os
+import tempfile
+
 from typing import Any
 
+HASH_CHUNK_SIZE = 1 << 20
+TMPFS_ROOT = "/dev/shm"
+
+
 def get_node_id(prefix: Any, suffix:str) -> str:
-    return f"{prefix}:{suffix}"
\ No newline at end of file
+    return f"{prefix}:{suffix}"
+
+
+def file_hash(path: str) -> str:
+    """Get the SHA-1 hex digest of the contents of the given file."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_scratch_dir(root: str=None, prefix: str="seal-") -> str:
+    """Create a new private scratch directory. Unless a `root` is given, a tmpfs-backed
+       location (i.e., "/dev/shm") is preferred when available to avoid disk contention,
+       falling back to the system's temporary directory.
+
+    Args:
+        root (str, optional): Directory to create the scratch directory in. Defaults to
+            None.
+        prefix (str, optional): Prefix of the scratch directory's name. Defaults to
+            "seal-".
+
+    Returns:
+        str: Path of the scratch directory.
+    """
+    if root is None and os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        root = TMPFS_ROOT
+    return tempfile.mkdtemp(prefix=prefix, dir=root)
@@ -1,10 +1,17 @@
-from random import randint
+import numpy as np
+import random
+
 from typing import List, Tuple, Union
 from os.path import join
 
-from seal.sumo.utils import random_trips
+from seal.sumo.utils.route_cache import RouteCache
+from seal.sumo.utils.router import (MAX_IN_PROCESS_EDGES, get_router,
+                                    write_flow_routes, write_routes)
+from seal.sumo.utils.trips import (get_trip_generator, route_trips, write_flows,
+                                   write_trips)
 
 VALID_DISTRIBUTIONS = ["arcsine", "uniform", "zipf"]
+VALID_ROUTERS = ["auto", "duarouter", "python"]
 
 
 def generate_random_routes(
@@ -15,6 +22,14 @@ def generate_random_routes(
     end_time: Union[int, Tuple[int, int]]=(1500, 3000),
     seed: float=None,
     path: str=None,
+    routefile: str=None,
+    tripfile: str=None,
+    cache: RouteCache=None,
+    router: str="duarouter",
+    flows: int=0,
+    binomial: int=None,
+    min_distance: float=0.0,
+    max_distance: float=None,
 ) -> List[str]:
     """This function generates a *.rou.xml file for vehicles in the given road network.
 
@@ -23,16 +38,71 @@ def generate_random_routes(
     net_name : str
         Filename of the SUMO *.net.xml file.
     n_vehicles : int
-        Number of vehicles to be used in the simulation.
+        Number of vehicles to be used in the simulation (the expected number if `flows`
+        or `binomial` is given).
     generator : str
         A token that specifies the random distribution that will be used to assigning
-        routes to vehicles.
+        routes to vehicles. In flow mode, this is the distribution the rates of the
+        origin-destination pairs are drawn from (see `sample_rate_weights()`).
     seed : float, optional
-        A random seed to fix the generator distribution, by default None
+        A random seed to fix the generator distribution, by default None. If provided,
+        the generated routes are fully determined by the seed (including the values
+        drawn for `n_vehicles` and `end_time` when they are ranges); the i-th route
+        file uses `seed + i`.
+    path : str, optional
+        Directory the route and trip files are written to, by default None (i.e., the
+        current working directory).
+    routefile : str, optional
+        Exact path of the route file to write (only valid if `n_routefiles` is 1); this
+        takes precedence over `path`, by default None.
+    tripfile : str, optional
+        Exact path of the intermediate trip file to write, by default None (i.e.,
+        "trips.trips.xml" in `path`).
+    cache : RouteCache, optional
+        Cache of routed files to reuse; only used if `seed` is provided, by default None.
+        Cached route files are returned from the cache's directory.
+    router : str, optional
+        How the trips are routed: "duarouter" runs SUMO's `duarouter`, "python" routes
+        them in-process along their fastest free-flow path (skipping the trip file and
+        the `duarouter` subprocess), and "auto" uses the latter for small nets (see
+        `MAX_IN_PROCESS_EDGES`), by default "duarouter".
+    flows : int, optional
+        If positive, the demand is written as this many `<flow>` elements between
+        random origin-destination pairs (whose rates add up to `n_vehicles / end_time`)
+        instead of one `<trip>` per vehicle, which keeps the route file small no matter
+        the traffic volume, by default 0.
+    binomial : int, optional
+        If given, departures are random rather than equidistant: the number of vehicles
+        departing each second follows a binomial distribution with `n=binomial` (split
+        into `binomial` sub-flows per flow in flow mode), by default None.
+    min_distance : float, optional
+        Minimum (euclidean) distance between the start of a trip's source edge and the
+        end of its sink edge; trips (or flows) are redrawn until they satisfy it, by
+        default 0.0.
+    max_distance : float, optional
+        Maximum (euclidean) distance between the start of a trip's source edge and the
+        end of its sink edge, by default None (i.e., unbounded).
+
+    Returns
+    -------
+    List[str]
+        Paths of the generated (or cached) route files.
     """
     if isinstance(n_vehicles, int):
         assert n_vehicles > 0
     assert generator.lower() in VALID_DISTRIBUTIONS
+    assert router in VALID_ROUTERS
+    assert flows >= 0
+    assert binomial is None or binomial > 0
+    assert max_distance is None or max_distance > min_distance
+
+    if routefile is not None:
+        assert n_routefiles == 1, \
+            "`routefile` can only be provided when generating a single route file."
+
+    # Ranges are drawn from a seeded generator (if a seed is given) so that the
+    # scenario is reproducible.
+    rng = random if (seed is None) else random.Random(seed)
 
     if isinstance(n_vehicles, tuple):
         assert len(n_vehicles) == 2, \
@@ -40,7 +110,7 @@ def generate_random_routes(
         a, b = n_vehicles
         assert a < b, \
             "`n_vehicles` must be a valid and sorted range."
-        n_vehicles = randint(a, b)
+        n_vehicles = rng.randint(a, b)
 
     if isinstance(end_time, tuple):
         assert len(end_time) == 2, \
@@ -48,16 +118,19 @@ def generate_random_routes(
         a, b = end_time
         assert a < b, \
             "`end_time` must be a valid and sorted range."
-        end_time = randint(a, b)
+        end_time = rng.randint(a, b)
 
     begin_time = 0
     routes = []
+    given_routefile = routefile
     for i in range(n_routefiles):
         routefile = "traffic.rou.xml" \
                     if (n_routefiles == 1) \
                     else f"traffic_{i}.rou.xml"
         if path is not None:
             routefile = join(path, routefile)
+        if given_routefile is not None:
+            routefile = given_routefile
 
         # Use with the v1 version that Aram sent you.
         # opts = rrs.set_options(
@@ -72,16 +145,56 @@ def generate_random_routes(
         #     dir=path
         # )
 
-        # Use with the most recent version of randomTrips.py on GitHub.
-        tripfile = join(path, "trips.trips.xml")
-        args = ["--net-file", net_name, "--route-file", routefile, "-b", begin_time,
-                "-e", end_time, "--length", "--period", end_time/n_vehicles,
-                "--seed", seed, "--output-trip-file", tripfile,
-                "--random"]  # NOTE: The `--random` flag basically makes it ignore `seed`.
-        opts = random_trips.get_options(args=args)
+        # Reuse the routes of an identical (i.e., seeded) scenario if they are cached.
+        file_seed = None if (seed is None) else int(seed) + i
+        key = None
+        if cache is not None and file_seed is not None:
+            key = cache.key(net_name, n_vehicles=n_vehicles, end_time=end_time,
+                            generator=generator.lower(), seed=file_seed,
+                            router=router, flows=flows, binomial=binomial,
+                            min_distance=min_distance, max_distance=max_distance)
+            cached_routefile = cache.get(key)
+            if cached_routefile is not None:
+                routes.append(cached_routefile)
+                continue
+
+        if tripfile is None:
+            tripfile = "trips.trips.xml" if (path is None) \
+                       else join(path, "trips.trips.xml")
+        trip_rng = np.random.default_rng(file_seed)
+        trip_generator = get_trip_generator(net_name, length=True,
+                                            min_distance=min_distance,
+                                            max_distance=max_distance)
+        in_process = router == "python" or (
+            router == "auto" and
+            len(trip_generator.net.getEdges()) <= MAX_IN_PROCESS_EDGES
+        )
+        if flows > 0:
+            demand = trip_generator.generate_flows(
+                trip_rng, n_flows=flows, rate=n_vehicles/(end_time-begin_time),
+                distribution=generator.lower())
+            if in_process:
+                write_flow_routes(routefile, demand,
+                                  get_router(trip_generator.net, trip_generator.vclass),
+                                  begin=begin_time, end=end_time, binomial=binomial)
+            else:
+                write_flows(tripfile, demand, begin=begin_time, end=end_time,
+                            binomial=binomial)
+        else:
+            demand = trip_generator.generate(trip_rng, begin=begin_time, end=end_time,
+                                             period=end_time/n_vehicles,
+                                             binomial=binomial)
+            if in_process:
+                write_routes(routefile, demand,
+                             get_router(trip_generator.net, trip_generator.vclass))
+            else:
+                write_trips(tripfile, demand)
+        if not in_process:
+            route_trips(net_name, tripfile, routefile, begin=begin_time, end=end_time)
 
+        if key is not None:
+            routefile = cache.put(key, routefile)
         routes.append(routefile)
-        random_trips.main(opts)
 
     return routes
 
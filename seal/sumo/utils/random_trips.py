@@ -28,6 +28,7 @@ import subprocess
 from collections import defaultdict
 import math
 import optparse
+import numpy as np
 
 if "SUMO_HOME" in os.environ:
     sys.path.append(os.path.join(os.environ["SUMO_HOME"], "tools"))
@@ -227,6 +228,36 @@ class RandomEdgeGenerator:
         index = bisect.bisect(self.cumulative_weights, r)
         return self.net._edges[index]
 
+    def sample(self, k, rng):
+        """Draw the indices (into `net._edges`) of `k` edges at once with the alias
+           method, i.e., in O(1) per draw after an O(n) setup on the first call."""
+        if self.__alias is None:
+            self.__build_alias_table()
+        prob, alias = self.__alias
+        index = rng.integers(len(prob), size=k)
+        keep = rng.random(k) < prob[index]
+        return np.where(keep, index, alias[index])
+
+    __alias = None
+
+    def __build_alias_table(self):
+        # Vose's alias method: every column holds at most two edges, its own index
+        # (with probability `prob`) and its `alias` (with the remaining probability).
+        weights = np.diff(self.cumulative_weights, prepend=0.0)
+        n = len(weights)
+        scaled = weights * n / self.total_weight
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        self.__alias = (prob, alias)
+
     def write_weights(self, fname, interval_id, begin, end):
         # normalize to [0,100]
         normalizer = 100.0 / max(1, max(map(self.weight_fun, self.net._edges)))
@@ -275,6 +306,55 @@ class RandomTripGenerator:
                 return source_edge, sink_edge, intermediate
         raise Exception("no trip found after %s tries" % maxtries)
 
+    def get_trips(self, k, min_distance, max_distance, rng, maxtries=100):
+        """Batched version of `get_trip` (without intermediate way points) that draws
+           the source and sink edge indices of `k` trips at once. Only the trips that
+           violate the distance constraints are redrawn (with the distances of each
+           batch computed from per-edge coordinates); the ones still invalid after
+           `maxtries` draws are returned as -1."""
+        if self.intermediate > 0:
+            raise ValueError("Batched trips do not support intermediate way points.")
+        sources = self.source_generator.sample(k, rng)
+        sinks = self.sink_generator.sample(k, rng)
+        if min_distance <= 0 and max_distance is None:
+            return sources, sinks
+
+        starts, ends = self.get_coords()
+        invalid = np.arange(k)
+        for attempt in range(maxtries):
+            if attempt > 0:
+                sources[invalid] = self.source_generator.sample(len(invalid), rng)
+                sinks[invalid] = self.sink_generator.sample(len(invalid), rng)
+            delta = starts[sources[invalid]] - ends[sinks[invalid]]
+            distance = np.hypot(delta[:, 0], delta[:, 1])
+            bad = distance < min_distance
+            if max_distance is not None:
+                bad |= distance >= max_distance
+            invalid = invalid[bad]
+            if len(invalid) == 0:
+                break
+        sources[invalid] = -1
+        sinks[invalid] = -1
+        return sources, sinks
+
+    __coords = None
+
+    def get_coords(self):
+        """(x, y) coordinates of the start of each edge and of its end (its start for
+           pedestrians), i.e., of the points a trip's distance is measured between in
+           `get_trip`. Only O(n) is stored, so this also scales to large nets."""
+        if self.__coords is None:
+            edges = self.source_generator.net._edges
+            starts = np.array([e.getFromNode().getCoord()[:2] for e in edges],
+                              dtype=float)
+            if self.pedestrians:
+                ends = starts
+            else:
+                ends = np.array([e.getToNode().getCoord()[:2] for e in edges],
+                                dtype=float)
+            self.__coords = (starts, ends)
+        return self.__coords
+
 
 def get_prob_fun(options, fringe_bonus, fringe_forbidden, max_length):
     # fringe_bonus None generates intermediate way points
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from typing import Any, List
+
+from seal.sumo.utils.core import file_hash
+
+ROUTE_SUFFIX = ".rou.xml"
+# Bumped whenever the same seed and parameters would generate different routes.
+ROUTE_CACHE_VERSION = 1
+
+
+class RouteCache:
+    """A content-addressed store of routed *.rou.xml files. Each file is stored under a
+       unique name derived from the contents of the net-file and the parameters used to
+       generate the routes (including the seed), so any deterministic scenario only has
+       to be generated (and routed by `duarouter`) once. The least recently used files
+       are evicted once the cache exceeds its disk budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """Initialize the cache (creating its directory if necessary).
+
+        Args:
+            directory (str): Directory the route files are stored in.
+            max_bytes (int): Disk budget of the cache (in bytes).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, net_name: str, **params: Any) -> str:
+        """Get the cache key of the routes generated for the given net-file with the
+           given (JSON-serializable) generation parameters.
+
+        Args:
+            net_name (str): Path to the SUMO *.net.xml file.
+
+        Returns:
+            str: The cache key.
+        """
+        payload = json.dumps({"version": ROUTE_CACHE_VERSION, "net": file_hash(net_name),
+                              **params}, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ROUTE_SUFFIX)
+
+    def get(self, key: str) -> str:
+        """Get the path of the cached route file for the given key (marking it as
+           recently used).
+
+        Args:
+            key (str): The cache key (see `key()`).
+
+        Returns:
+            str: Path of the cached route file, or None if it is not cached.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, routefile: str) -> str:
+        """Copy the given route file into the cache and evict the least recently used
+           files if the cache is over its disk budget.
+
+        Args:
+            key (str): The cache key (see `key()`).
+            routefile (str): Path of the route file to cache.
+
+        Returns:
+            str: Path of the cached route file.
+        """
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(routefile, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict(keep=[path])
+        return path
+
+    def evict(self, keep: List[str]=None) -> None:
+        """Delete the least recently used route files until the cache fits its budget.
+
+        Args:
+            keep (List[str], optional): Paths that must not be evicted. Defaults to None.
+        """
+        keep = set() if keep is None else set(keep)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ROUTE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,136 @@
+import itertools
+import os
+import random
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Tuple
+
+from seal.sumo.utils.random_routes import generate_random_routes
+from seal.sumo.utils.route_cache import RouteCache
+
+
+def _init_worker() -> None:
+    # Forked workers inherit the parent's random state, so reseed them from the OS to
+    # avoid every worker generating the same routes.
+    random.seed()
+
+
+def _generate_routes(
+    net_name: str,
+    routefile: str,
+    tripfile: str,
+    rand_args: Dict[str, Any],
+    cache: RouteCache
+) -> str:
+    rand_args = dict(rand_args, n_routefiles=1)
+    return generate_random_routes(net_name=net_name, routefile=routefile,
+                                  tripfile=tripfile, cache=cache, **rand_args)[0]
+
+
+class RoutePool:
+    """Generates random route files ahead of time in a pool of background processes so
+       that resetting an environment does not have to wait for trip generation and
+       `duarouter`. The pool keeps `size` route files (for one net-file and one set of
+       `generate_random_routes` arguments) ready or in progress. Every call to `get()`
+       hands out one of them and immediately schedules a replacement. If a `seed` is
+       given, the i-th route file generated (and handed out) by the pool uses
+       `seed + i`.
+    """
+
+    def __init__(
+        self,
+        net_name: str,
+        directory: str,
+        size: int,
+        rand_args: Dict[str, Any]=None,
+        max_workers: int=None,
+        seed: int=None,
+        cache: RouteCache=None
+    ) -> None:
+        """Start generating the first `size` route files.
+
+        Args:
+            net_name (str): Path to the SUMO *.net.xml file.
+            directory (str): Directory the route (and trip) files are written to.
+            size (int): Number of route files to keep ready (or in progress).
+            rand_args (Dict[str, Any], optional): Arguments for
+                `generate_random_routes()`. Defaults to None.
+            max_workers (int, optional): Number of background processes. Defaults to
+                None (i.e., `min(size, os.cpu_count())`).
+            seed (int, optional): Base seed of the generated route files. Defaults to
+                None (i.e., unseeded).
+            cache (RouteCache, optional): Cache of routed files for seeded scenarios.
+                Defaults to None.
+        """
+        assert size > 0, "`size` must be positive."
+        self.net_name = net_name
+        self.directory = directory
+        self.size = size
+        self.rand_args = dict() if rand_args is None else dict(rand_args)
+        self.seed = seed
+        self.cache = cache
+        self.__counter = itertools.count()
+        # Each pending entry is the future of a route file and the path of the route
+        # file the pool itself writes (the former may be a path in the `cache`).
+        self.__pending: Deque[Tuple[Future, str]] = deque()
+        self.__last = None
+        self.__executor = ProcessPoolExecutor(
+            max_workers=max_workers or min(size, os.cpu_count() or 1),
+            initializer=_init_worker
+        )
+        for _ in range(size):
+            self.__submit()
+
+    def get(self) -> str:
+        """Get a route file. A seeded pool hands out its route files in order (i.e., the
+           i-th call returns the route file of `seed + i`, blocking until it is done) so
+           that the routes only depend on the seed. An unseeded pool prefers one that is
+           already done (this only blocks if none of them are). The route file handed
+           out by the previous call is deleted since the simulation is about to load a
+           new one.
+
+        Returns:
+            str: Path of the route file.
+        """
+        if self.seed is not None:
+            entry = self.__pending.popleft()
+        else:
+            entry = next((e for e in self.__pending if e[0].done()), self.__pending[0])
+            self.__pending.remove(entry)
+        self.__submit()
+        future, own_routefile = entry
+        routefile = future.result()
+
+        if self.__last is not None:
+            self.__remove(self.__last)
+        self.__last = own_routefile
+        return routefile
+
+    def close(self) -> None:
+        """Stop the background processes and delete every file of this pool."""
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        for _, own_routefile in self.__pending:
+            self.__remove(own_routefile)
+        self.__pending.clear()
+        if self.__last is not None:
+            self.__remove(self.__last)
+            self.__last = None
+
+    def __submit(self) -> None:
+        idx = next(self.__counter)
+        routefile = os.path.join(self.directory, f"pool_{idx}.rou.xml")
+        tripfile = os.path.join(self.directory, f"pool_{idx}.trips.xml")
+        rand_args = self.rand_args
+        if self.seed is not None:
+            rand_args = dict(rand_args, seed=self.seed + idx)
+        future = self.__executor.submit(
+            _generate_routes, self.net_name, routefile, tripfile, rand_args, self.cache)
+        self.__pending.append((future, routefile))
+
+    def __remove(self, routefile: str) -> None:
+        # NOTE: `duarouter` also writes the route alternatives next to the route file.
+        prefix = routefile[:-len(".rou.xml")]
+        for path in (routefile, prefix + ".rou.alt.xml", prefix + ".trips.xml"):
+            if os.path.exists(path):
+                os.remove(path)
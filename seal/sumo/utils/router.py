@@ -0,0 +1,184 @@
+import heapq
+import io
+import numpy as np
+import sumolib
+import weakref
+
+from typing import Dict, List
+
+from seal.sumo.utils.trips import Flows, Trips, get_flow_elements
+
+# Largest net (in number of edges) that the "auto" router setting routes in-process.
+MAX_IN_PROCESS_EDGES = 2000
+
+
+class ShortestPathRouter:
+    """An in-process router for small road networks. Vehicles are routed along the path
+       with the least free-flow travel time (i.e., the sum of `length / speed` over its
+       edges), which is what `duarouter` computes for trips when it has no edge weights.
+       The shortest path tree of each source edge is computed with Dijkstra's algorithm
+       on first use and cached, so routing a new batch of trips mostly consists of
+       walking cached predecessor arrays.
+    """
+
+    def __init__(self, net: sumolib.net.Net, vclass: str="passenger") -> None:
+        """Build the edge graph of the given net for the given vehicle class.
+
+        Args:
+            net (sumolib.net.Net): The road network.
+            vclass (str, optional): Vehicle class the routes must permit. Defaults to
+                "passenger".
+        """
+        edges = net.getEdges()
+        self.edge_ids = [edge.getID() for edge in edges]
+        self.edge_index = {edge_id: i for i, edge_id in enumerate(self.edge_ids)}
+        self.costs = np.array([edge.getLength() / max(edge.getSpeed(), 1e-6)
+                               for edge in edges])
+
+        # Successors of each edge reachable through a connection usable by `vclass`.
+        self.successors: List[List[int]] = []
+        for edge in edges:
+            successors = []
+            if edge.allows(vclass):
+                for to_edge, connections in edge.getOutgoing().items():
+                    if to_edge.allows(vclass) and any(
+                        conn.getFromLane().allows(vclass) and
+                        conn.getToLane().allows(vclass)
+                        for conn in connections
+                    ):
+                        successors.append(self.edge_index[to_edge.getID()])
+            self.successors.append(sorted(successors))
+
+        self.__trees: Dict[int, np.ndarray] = {}
+
+    def route(self, source: str, sink: str) -> List[str]:
+        """Get the fastest route from the source edge to the sink edge.
+
+        Args:
+            source (str): ID of the source edge.
+            sink (str): ID of the sink edge.
+
+        Returns:
+            List[str]: IDs of the edges of the route, or None if the sink is unreachable.
+        """
+        source, sink = self.edge_index[source], self.edge_index[sink]
+        predecessors = self.__tree(source)
+        if source != sink and predecessors[sink] < 0:
+            return None
+        route = [sink]
+        while route[-1] != source:
+            route.append(predecessors[route[-1]])
+        return [self.edge_ids[i] for i in reversed(route)]
+
+    def __tree(self, source: int) -> np.ndarray:
+        predecessors = self.__trees.get(source, None)
+        if predecessors is not None:
+            return predecessors
+
+        # The cost of a path is the travel time of every edge it enters (the cost of
+        # the source edge is the same for every path and is thus left out).
+        predecessors = np.full(len(self.edge_ids), -1, dtype=int)
+        dist = np.full(len(self.edge_ids), np.inf)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for v in self.successors[u]:
+                alt = d + self.costs[v]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    predecessors[v] = u
+                    heapq.heappush(heap, (alt, v))
+
+        self.__trees[source] = predecessors
+        return predecessors
+
+
+_routers = weakref.WeakKeyDictionary()
+
+
+def get_router(net: sumolib.net.Net, vclass: str="passenger") -> ShortestPathRouter:
+    """Get the router of the given net (and vehicle class), reusing the one built by an
+       earlier call for as long as the net object is alive.
+
+    Args:
+        net (sumolib.net.Net): The road network.
+        vclass (str, optional): Vehicle class the routes must permit. Defaults to
+            "passenger".
+
+    Returns:
+        ShortestPathRouter: The router.
+    """
+    routers = _routers.setdefault(net, {})
+    if vclass not in routers:
+        routers[vclass] = ShortestPathRouter(net, vclass)
+    return routers[vclass]
+
+
+def write_routes(
+    routefile: str,
+    trips: Trips,
+    router: ShortestPathRouter,
+    prefix: str=""
+) -> None:
+    """Route trips in-process and write them to a *.rou.xml file (with a single buffered
+       write). As with `duarouter --ignore-errors`, trips without a route are dropped.
+
+    Args:
+        routefile (str): Path of the route file to write.
+        trips (Trips): The trips to route.
+        router (ShortestPathRouter): The router of the trips' net.
+        prefix (str, optional): Prefix of the vehicle IDs. Defaults to "".
+    """
+    buffer = io.StringIO()
+    sumolib.writeXMLHeader(buffer, "$Id$", "routes")  # noqa
+    for idx, (depart, source, sink) in enumerate(zip(trips.departs.tolist(),
+                                                     trips.sources.tolist(),
+                                                     trips.sinks.tolist())):
+        route = router.route(source, sink)
+        if route is None:
+            continue
+        buffer.write(f'    <vehicle id="{prefix}{idx}" depart="{depart:.2f}">\n'
+                     f'        <route edges="{" ".join(route)}"/>\n'
+                     f'    </vehicle>\n')
+    buffer.write("</routes>\n")
+    with open(routefile, "w") as f:
+        f.write(buffer.getvalue())
+
+
+def write_flow_routes(
+    routefile: str,
+    flows: Flows,
+    router: ShortestPathRouter,
+    begin: float,
+    end: float,
+    binomial: int=None,
+    prefix: str=""
+) -> None:
+    """Route flows in-process and write them to a *.rou.xml file (with a single buffered
+       write). As with `duarouter --ignore-errors`, flows without a route are dropped.
+
+    Args:
+        routefile (str): Path of the route file to write.
+        flows (Flows): The flows to route.
+        router (ShortestPathRouter): The router of the flows' net.
+        begin (float): Begin time of the flows.
+        end (float): End time of the flows.
+        binomial (int, optional): Number of sub-flows per flow (see
+            `get_flow_elements()`). Defaults to None.
+        prefix (str, optional): Prefix of the flow IDs. Defaults to "".
+    """
+    buffer = io.StringIO()
+    sumolib.writeXMLHeader(buffer, "$Id$", "routes")  # noqa
+    for (attrs, source, sink) in get_flow_elements(flows, begin, end, binomial, prefix):
+        route = router.route(source, sink)
+        if route is None:
+            continue
+        buffer.write(f'    <flow {attrs}>\n'
+                     f'        <route edges="{" ".join(route)}"/>\n'
+                     f'    </flow>\n')
+    buffer.write("</routes>\n")
+    with open(routefile, "w") as f:
+        f.write(buffer.getvalue())
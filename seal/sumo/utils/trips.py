@@ -0,0 +1,329 @@
+import io
+import numpy as np
+import os
+import subprocess
+import sumolib
+
+from typing import Dict, List, NamedTuple, Tuple
+
+from seal.sumo.utils import random_trips
+
+MAX_CACHED_GENERATORS = 8
+
+
+class Trips(NamedTuple):
+    """A batch of generated trips: the departure time, source edge ID, and sink edge ID
+       of each vehicle (in order of departure).
+    """
+    departs: np.ndarray
+    sources: np.ndarray
+    sinks: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.departs)
+
+
+class Flows(NamedTuple):
+    """A batch of generated flows: the source edge ID, sink edge ID, and rate (in
+       vehicles per second) of each origin-destination pair.
+    """
+    sources: np.ndarray
+    sinks: np.ndarray
+    rates: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+
+def sample_rate_weights(
+    rng: np.random.Generator,
+    n: int,
+    distribution: str
+) -> np.ndarray:
+    """Draw the relative weights (summing to 1) of `n` flows from a distribution.
+
+    Args:
+        rng (np.random.Generator): Random generator to draw the weights from.
+        n (int): Number of weights.
+        distribution (str): Either "uniform", "arcsine" (i.e., Beta(0.5, 0.5), which
+            favors a mix of very busy and nearly empty flows), or "zipf" (i.e., the
+            flows' weights are proportional to 1/rank in a random order).
+
+    Raises:
+        ValueError: Occurs if the distribution is unknown.
+
+    Returns:
+        np.ndarray: The weights.
+    """
+    if distribution == "uniform":
+        weights = rng.random(n)
+    elif distribution == "arcsine":
+        weights = rng.beta(0.5, 0.5, size=n)
+    elif distribution == "zipf":
+        weights = rng.permutation(1.0 / np.arange(1, n + 1))
+    else:
+        raise ValueError(f"Unknown rate distribution '{distribution}'.")
+    return weights / weights.sum()
+
+
+class TripGenerator:
+    """Generates random vehicle trips for a road network without going through the
+       command-line interface of `random_trips`. The `sumolib` net and the
+       `RandomTripGenerator` built by `random_trips` are loaded only once (see
+       `get_trip_generator()` for a cached instance per net-file), and every departure,
+       source, and sink edge of a batch is drawn at once with a NumPy `Generator`.
+    """
+
+    def __init__(
+        self,
+        net_name: str,
+        length: bool=True,
+        min_distance: float=0.0,
+        max_distance: float=None,
+        maxtries: int=100,
+        vclass: str="passenger"
+    ) -> None:
+        """Load the road network and build the source and sink edge distributions.
+
+        Args:
+            net_name (str): Path to the SUMO *.net.xml file.
+            length (bool, optional): Weight the edge probabilities by edge length.
+                Defaults to True.
+            min_distance (float, optional): Minimum (euclidean) distance between the
+                start and end of a trip. Defaults to 0.0.
+            max_distance (float, optional): Maximum (euclidean) distance between the
+                start and end of a trip. Defaults to None (i.e., unbounded).
+            maxtries (int, optional): Number of times a trip that violates the distance
+                constraints is redrawn before it is dropped. Defaults to 100.
+            vclass (str, optional): Vehicle class the source and sink edges must permit.
+                Defaults to "passenger".
+
+        Raises:
+            ValueError: Occurs if the net has no valid source or sink edges.
+        """
+        self.net_name = net_name
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.maxtries = maxtries
+        self.vclass = vclass
+
+        args = ["--net-file", net_name, "--vclass", vclass,
+                "--min-distance", str(min_distance), "--maxtries", str(maxtries)]
+        if length:
+            args.append("--length")
+        if max_distance is not None:
+            args.extend(["--max-distance", str(max_distance)])
+        options = random_trips.get_options(args=args)
+
+        self.net = sumolib.net.readNet(net_name)
+        self.generator = random_trips.buildTripGenerator(self.net, options)
+        if self.generator is None:
+            raise ValueError(f"No valid source or sink edges in net '{net_name}'.")
+        self.edge_ids = np.array([edge.getID() for edge in self.net._edges])
+
+    def generate(
+        self,
+        rng: np.random.Generator,
+        begin: float,
+        end: float,
+        period: float,
+        binomial: int=None
+    ) -> Trips:
+        """Generate trips with equidistant departure times in `[begin, end)`.
+
+        Args:
+            rng (np.random.Generator): Random generator to draw the trips from.
+            begin (float): Departure time of the first trip.
+            end (float): End of the departure time interval.
+            period (float): Time between two departures.
+            binomial (int, optional): If given, the number of departures in each second
+                is instead drawn from a binomial distribution with `n=binomial` and
+                `p=1/(period*binomial)` (as `random_trips` does). Defaults to None.
+
+        Returns:
+            Trips: The generated trips. Trips for which no source/sink pair satisfied
+                the distance constraints within `maxtries` draws are dropped.
+        """
+        if binomial is None:
+            departs = np.arange(begin, end, period)
+        else:
+            seconds = np.arange(begin, end, 1.0)
+            counts = rng.binomial(binomial, min(1.0, 1.0 / period / binomial),
+                                  size=len(seconds))
+            departs = np.repeat(seconds, counts)
+        sources, sinks = self.generator.get_trips(
+            len(departs), self.min_distance, self.max_distance, rng, self.maxtries)
+        valid = sources >= 0
+        return Trips(departs[valid], self.edge_ids[sources[valid]],
+                     self.edge_ids[sinks[valid]])
+
+    def generate_flows(
+        self,
+        rng: np.random.Generator,
+        n_flows: int,
+        rate: float,
+        distribution: str="uniform"
+    ) -> Flows:
+        """Generate flows between random origin-destination pairs. The total `rate` is
+           split among the flows by weights drawn from the given distribution.
+
+        Args:
+            rng (np.random.Generator): Random generator to draw the flows from.
+            n_flows (int): Number of flows (i.e., origin-destination pairs).
+            rate (float): Expected number of vehicles per second of all flows combined.
+            distribution (str, optional): Distribution of the flows' relative rates (see
+                `sample_rate_weights()`). Defaults to "uniform".
+
+        Returns:
+            Flows: The generated flows. Flows for which no source/sink pair satisfied
+                the distance constraints within `maxtries` draws, or whose rate is zero,
+                are dropped.
+        """
+        sources, sinks = self.generator.get_trips(
+            n_flows, self.min_distance, self.max_distance, rng, self.maxtries)
+        rates = rate * sample_rate_weights(rng, n_flows, distribution)
+        valid = (sources >= 0) & (rates > 0)
+        return Flows(self.edge_ids[sources[valid]], self.edge_ids[sinks[valid]],
+                     rates[valid])
+
+
+_generators: Dict[Tuple, TripGenerator] = {}
+
+
+def get_trip_generator(net_name: str, **kwargs) -> TripGenerator:
+    """Get the `TripGenerator` of the given net-file (and generator arguments), reusing
+       the one built by an earlier call in this process unless the net-file changed.
+
+    Args:
+        net_name (str): Path to the SUMO *.net.xml file.
+
+    Returns:
+        TripGenerator: The trip generator.
+    """
+    stat = os.stat(net_name)
+    key = (os.path.abspath(net_name), stat.st_mtime_ns, stat.st_size,
+           tuple(sorted(kwargs.items())))
+    generator = _generators.pop(key, None)
+    if generator is None:
+        generator = TripGenerator(net_name, **kwargs)
+    # Keep the most recently used generators (re-inserted last) within the budget.
+    _generators[key] = generator
+    while len(_generators) > MAX_CACHED_GENERATORS:
+        del _generators[next(iter(_generators))]
+    return generator
+
+
+def write_trips(tripfile: str, trips: Trips, prefix: str="") -> None:
+    """Write trips to a *.trips.xml file (with a single buffered write).
+
+    Args:
+        tripfile (str): Path of the trip file to write.
+        trips (Trips): The trips to write.
+        prefix (str, optional): Prefix of the trip IDs. Defaults to "".
+    """
+    buffer = io.StringIO()
+    sumolib.writeXMLHeader(buffer, "$Id$", "routes")  # noqa
+    buffer.write("".join([
+        f'    <trip id="{prefix}{idx}" depart="{depart:.2f}" from="{source}" '
+        f'to="{sink}"/>\n'
+        for idx, (depart, source, sink) in enumerate(zip(trips.departs.tolist(),
+                                                         trips.sources.tolist(),
+                                                         trips.sinks.tolist()))
+    ]))
+    buffer.write("</routes>\n")
+    with open(tripfile, "w") as f:
+        f.write(buffer.getvalue())
+
+
+def get_flow_elements(
+    flows: Flows,
+    begin: float,
+    end: float,
+    binomial: int=None,
+    prefix: str=""
+) -> List[Tuple[str, str, str]]:
+    """Get the attributes of the `<flow>` elements of the given flows. Each flow departs
+       vehicles with a fixed period of `1/rate` or, if `binomial` is given, is split into
+       `binomial` sub-flows that each depart a vehicle every second with probability
+       `rate/binomial` (as `random_trips` does).
+
+    Args:
+        flows (Flows): The flows.
+        begin (float): Begin time of the flows.
+        end (float): End time of the flows.
+        binomial (int, optional): Number of sub-flows per flow. Defaults to None.
+        prefix (str, optional): Prefix of the flow IDs. Defaults to "".
+
+    Returns:
+        List[Tuple[str, str, str]]: The ID and timing attributes, source edge ID, and
+            sink edge ID of each `<flow>` element.
+    """
+    elements = []
+    for idx, (source, sink, rate) in enumerate(zip(flows.sources.tolist(),
+                                                   flows.sinks.tolist(),
+                                                   flows.rates.tolist())):
+        if binomial is None:
+            elements.append((f'id="{prefix}{idx}" begin="{begin}" end="{end}" '
+                             f'period="{1.0 / rate:.3f}"', source, sink))
+        else:
+            probability = min(1.0, rate / binomial)
+            elements.extend(
+                (f'id="{prefix}{idx}#{j}" begin="{begin}" end="{end}" '
+                 f'probability="{probability:.6f}"', source, sink)
+                for j in range(binomial)
+            )
+    return elements
+
+
+def write_flows(
+    tripfile: str,
+    flows: Flows,
+    begin: float,
+    end: float,
+    binomial: int=None,
+    prefix: str=""
+) -> None:
+    """Write flows to a *.trips.xml file (with a single buffered write).
+
+    Args:
+        tripfile (str): Path of the trip file to write.
+        flows (Flows): The flows to write.
+        begin (float): Begin time of the flows.
+        end (float): End time of the flows.
+        binomial (int, optional): Number of sub-flows per flow (see
+            `get_flow_elements()`). Defaults to None.
+        prefix (str, optional): Prefix of the flow IDs. Defaults to "".
+    """
+    buffer = io.StringIO()
+    sumolib.writeXMLHeader(buffer, "$Id$", "routes")  # noqa
+    buffer.write("".join([
+        f'    <flow {attrs} from="{source}" to="{sink}"/>\n'
+        for (attrs, source, sink) in get_flow_elements(flows, begin, end, binomial,
+                                                       prefix)
+    ]))
+    buffer.write("</routes>\n")
+    with open(tripfile, "w") as f:
+        f.write(buffer.getvalue())
+
+
+def route_trips(
+    net_name: str,
+    tripfile: str,
+    routefile: str,
+    begin: float,
+    end: float
+) -> None:
+    """Route the trips of a *.trips.xml file with `duarouter` (using the same arguments
+       as `random_trips.main`).
+
+    Args:
+        net_name (str): Path to the SUMO *.net.xml file.
+        tripfile (str): Path of the trip file to route.
+        routefile (str): Path of the route file to write.
+        begin (float): Begin time of the routed trips.
+        end (float): End time of the routed trips.
+    """
+    args = [random_trips.DUAROUTER, "-n", net_name, "-r", tripfile, "--ignore-errors",
+            "--begin", str(begin), "--end", str(end), "--no-step-log", "--no-warnings",
+            "-o", routefile]
+    subprocess.call(args)
@@ -0,0 +1,124 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from gym import spaces
+from ray.rllib.env import BaseEnv
+from typing import Any, Dict, List, Tuple
+
+from seal.sumo.config import *
+from seal.sumo.env import SumoEnv
+
+MultiEnvDict = Dict[int, Dict[Any, Any]]
+
+
+class VectorSumoEnv(BaseEnv):
+    """Runs `num_envs` independent `SumoEnv` simulations side by side behind RLlib's
+       `BaseEnv` interface, so that a single rollout worker batches the policy inference
+       of all of them. Each sub-env has its own kernel (and thus its own labelled TraCI
+       connection and SUMO process) and is stepped on its own thread: while one
+       simulation is busy in SUMO, the observations of the others are built in Python.
+
+       Since RLlib uses a `BaseEnv` as is, this class can be passed directly as the `env`
+       of a trainer, with `num_envs` (and optionally `num_env_threads`) set in its
+       `env_config`. If a `seed` is given, the i-th sub-env uses
+       `seed + i * VECTOR_SEED_STRIDE` so that the sub-envs simulate different routes.
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self.num_envs = config.get("num_envs", DEFAULT_NUM_ENVS)
+        assert self.num_envs > 0, "`num_envs` must be positive."
+        if config.get("backend", DEFAULT_BACKEND) == "libsumo" and self.num_envs > 1:
+            raise ValueError("The 'libsumo' backend runs a single simulation per "
+                             "process; use the 'traci' backend for `num_envs` > 1.")
+
+        self.__executor = ThreadPoolExecutor(
+            max_workers=config.get("num_env_threads", None) or self.num_envs,
+            thread_name_prefix="seal-env"
+        )
+        # NOTE: The sub-envs are created (and thus first reset) one at a time since
+        #       starting SUMO through TraCI (e.g., picking a free port), starting route
+        #       pools, and filling the module-level trip generator and router caches
+        #       are not thread-safe. Only steps run on the threads; later resets (see
+        #       `try_reset()`) run on the calling thread once `poll()` has collected
+        #       every pending step.
+        self.envs: List[SumoEnv] = [
+            SumoEnv(self.__get_sub_config(config, i)) for i in range(self.num_envs)
+        ]
+        # Results to be returned by the next call to `poll()`, either the future of a
+        # step or the observations right after a reset.
+        self.__pending: Dict[int, Future] = {}
+        self.__reset_obs: MultiEnvDict = {
+            env_id: env._observe() for env_id, env in enumerate(self.envs)
+        }
+
+    @property
+    def observation_space(self) -> spaces.Space:
+        return self.envs[0].observation_space
+
+    @property
+    def action_space(self) -> spaces.Space:
+        return self.envs[0].action_space
+
+    def poll(self) -> Tuple[MultiEnvDict, MultiEnvDict, MultiEnvDict, MultiEnvDict,
+                            MultiEnvDict]:
+        """Collect the results of the sub-envs that were stepped (waiting for their steps
+           to finish) or reset since the last call.
+
+        Returns:
+            Tuple[MultiEnvDict, MultiEnvDict, MultiEnvDict, MultiEnvDict, MultiEnvDict]:
+                The observations, rewards, dones, infos, and off-policy actions (always
+                empty) of each sub-env, keyed by env ID.
+        """
+        obs, rewards, dones, infos = {}, {}, {}, {}
+        for env_id, env_obs in self.__reset_obs.items():
+            obs[env_id] = env_obs
+            rewards[env_id] = {}
+            dones[env_id] = {"__all__": False}
+            infos[env_id] = {}
+        self.__reset_obs = {}
+
+        for env_id, future in self.__pending.items():
+            obs[env_id], rewards[env_id], dones[env_id], infos[env_id] = future.result()
+        self.__pending = {}
+        return obs, rewards, dones, infos, {}
+
+    def send_actions(self, action_dict: MultiEnvDict) -> None:
+        """Start stepping each sub-env with its actions (without waiting for the steps
+           to finish).
+
+        Args:
+            action_dict (MultiEnvDict): The actions of each sub-env, keyed by env ID.
+        """
+        for env_id, actions in action_dict.items():
+            self.__pending[env_id] = self.__executor.submit(
+                self.envs[env_id].step, actions)
+
+    def try_reset(self, env_id: int=None) -> Dict[Any, Any]:
+        """Reset the given sub-env.
+
+        Args:
+            env_id (int, optional): ID of the sub-env. Defaults to None (i.e., 0).
+
+        Returns:
+            Dict[Any, Any]: The observations of the sub-env after the reset.
+        """
+        return self.envs[env_id or 0].reset()
+
+    def get_sub_environments(self) -> List[SumoEnv]:
+        return self.envs
+
+    def get_unwrapped(self) -> List[SumoEnv]:
+        return self.envs
+
+    def stop(self) -> None:
+        """Close every sub-env and stop the stepping threads."""
+        for future in self.__pending.values():
+            future.cancel()
+        self.__pending = {}
+        for env in self.envs:
+            env.close()
+        self.__executor.shutdown(wait=True)
+
+    def __get_sub_config(self, config: Dict[str, Any], env_id: int) -> Dict[str, Any]:
+        sub_config = dict(config)
+        if config.get("seed", DEFAULT_SEED) is not None:
+            sub_config["seed"] = config["seed"] + env_id * VECTOR_SEED_STRIDE
+        return sub_config
@@ -10,6 +10,7 @@ from ray.rllib.agents import (a3c, dqn, ppo)
 from time import ctime
 from typing import Any, Callable, Dict, List, Tuple
 
+from seal.trainer.callbacks import ProfilerCallbacks
 from seal.trainer.counter import Counter
 from seal.trainer.defaults import *
 from seal.trainer.util import *
@@ -155,7 +156,7 @@ class BaseTrainer(ABC):
     # ------------------------------------------------------------------------------ #
 
     def init_config(self) -> Dict[str, Any]:
-        return {
+        config = {
             "env_config": self.env_config_fn(),
             "framework": "torch",
             "log_level": self.log_level,
@@ -167,6 +168,9 @@ class BaseTrainer(ABC):
             "num_gpus": self.num_gpus,
             "num_workers": self.num_workers,
         }
+        if config["env_config"].get("profile", False):
+            config["callbacks"] = ProfilerCallbacks
+        return config
 
     # ------------------------------------------------------------------------------ #
 
@@ -0,0 +1,33 @@
+from ray.rllib.agents.callbacks import DefaultCallbacks
+from typing import Any, Dict
+
+
+class ProfilerCallbacks(DefaultCallbacks):
+    """Reports the step profile of each finished episode (see `StepProfiler`) as RLlib
+       custom metrics, i.e., the mean and 95th percentile duration (in milliseconds) of
+       each phase of a step and the mean number of TraCI calls (and subscription result
+       reads) per step. This requires
+       the env to be created with `profile=True`.
+    """
+
+    def on_episode_end(
+        self,
+        *,
+        worker: Any,
+        base_env: Any,
+        policies: Dict[str, Any],
+        episode: Any,
+        env_index: int=None,
+        **kwargs
+    ) -> None:
+        env = base_env.get_unwrapped()[env_index or 0]
+        profiler = getattr(getattr(env, "kernel", None), "profiler", None)
+        if profiler is None or not profiler.enabled:
+            return
+
+        for phase, stats in profiler.summary().items():
+            if not isinstance(stats, dict):  # i.e., a per-step mean of calls
+                episode.custom_metrics[phase] = stats
+                continue
+            episode.custom_metrics[f"{phase}_mean_ms"] = 1000 * stats["mean"]
+            episode.custom_metrics[f"{phase}_p95_ms"] = 1000 * stats["p95"]
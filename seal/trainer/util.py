@@ -8,6 +8,8 @@ DEFAULT_GUI = False
 DEFAULT_NET_FILE = join("configs", "two_inter", "two_inter.net.xml")
 DEFAULT_RAND_ROUTES_ON_RESET = True
 DEFAULT_RANKED = True
+DEFAULT_SEED = None
+DEFAULT_PROFILE = False
 
 Weights = NewType("Weights", Dict[Any, array])
 Policy = NewType("Policy", Dict[Any, array])
@@ -18,6 +20,8 @@ def get_env_config(**kwargs):
         "net-file": kwargs.get("net-file", DEFAULT_NET_FILE),
         "rand_routes_on_reset": kwargs.get("rand_routes_on_reset", DEFAULT_RAND_ROUTES_ON_RESET),
         "ranked": kwargs.get("ranked", DEFAULT_RANKED),
+        "seed": kwargs.get("seed", DEFAULT_SEED),
+        "profile": kwargs.get("profile", DEFAULT_PROFILE),
     }
     return config
 
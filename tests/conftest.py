@@ -0,0 +1,24 @@
+import os
+import pytest
+import shutil
+
+from seal.sumo.utils.random_routes import generate_random_routes
+
+CONFIGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "configs")
+NET_FILES = [os.path.join(CONFIGS, name, f"{name}.net.xml")
+             for name in ["single_inter", "two_inter", "complex_inter"]]
+
+# These tests run real SUMO simulations.
+requires_sumo = pytest.mark.skipif(shutil.which("sumo") is None,
+                                   reason="requires the `sumo` binary")
+
+
+@pytest.fixture
+def make_routefile(tmp_path):
+    """Generate a seeded route file (routed in-process) for the given net-file."""
+    def make(net_file: str, n_vehicles: int=300, end_time: int=300) -> str:
+        return generate_random_routes(
+            net_file, n_vehicles=n_vehicles, end_time=end_time, seed=0,
+            routefile=str(tmp_path / "traffic.rou.xml"), router="python")[0]
+    return make
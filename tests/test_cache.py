@@ -0,0 +1,55 @@
+import json
+import numpy as np
+import os
+import pytest
+import shutil
+
+from conftest import NET_FILES
+from seal.sumo.kernel.cache import get_cache_path, load_network_metadata
+from seal.sumo.kernel.trafficlight.hub import TrafficLightHub
+
+
+@pytest.fixture(params=NET_FILES, ids=os.path.basename)
+def net_file(request, tmp_path):
+    path = str(tmp_path / os.path.basename(request.param))
+    shutil.copyfile(request.param, path)
+    return path
+
+
+def test_cached_metadata_matches_parsed(net_file):
+    parsed = TrafficLightHub(net_file, use_cache=True)
+    cached = TrafficLightHub(net_file, use_cache=True)
+    assert cached.net is None  # i.e., the metadata came from the cache
+    assert cached.ids == parsed.ids
+    assert cached.tls_graph == parsed.tls_graph
+    np.testing.assert_array_equal(cached.graph_indptr, parsed.graph_indptr)
+    np.testing.assert_array_equal(cached.graph_indices, parsed.graph_indices)
+    for a, b in zip(parsed, cached):
+        assert a.program == b.program
+        np.testing.assert_array_equal(a.phase_stats, b.phase_stats)
+        if a.lane_table is None:
+            assert b.lane_table is None
+            continue
+        assert a.lane_table.lanes == b.lane_table.lanes
+        np.testing.assert_array_equal(a.lane_table.lengths, b.lane_table.lengths)
+        np.testing.assert_array_equal(a.lane_table.max_speeds, b.lane_table.max_speeds)
+        assert a.lane_table.total_length == b.lane_table.total_length
+
+
+def test_cache_is_invalidated(net_file):
+    TrafficLightHub(net_file, use_cache=True)
+    assert load_network_metadata(net_file) is not None
+
+    # A changed net-file invalidates the cache.
+    with open(net_file, "a") as f:
+        f.write("\n")
+    assert load_network_metadata(net_file) is None
+
+    # So does a header from another cache format or pointing outside of the data.
+    TrafficLightHub(net_file, use_cache=True)
+    with open(get_cache_path(net_file)) as f:
+        header = json.load(f)
+    header["graph_indices"][0] = header["size"] + 1
+    with open(get_cache_path(net_file), "w") as f:
+        json.dump(header, f)
+    assert load_network_metadata(net_file) is None
@@ -0,0 +1,113 @@
+import pytest
+import traci.constants as tc
+
+from conftest import NET_FILES, requires_sumo
+from seal.sumo.kernel.backend import SumoBackend
+from seal.sumo.kernel.kernel import SIMULATION_VARS, SumoKernel
+
+
+class FakeDomain:
+    """A TraCI domain whose getters return empty results (i.e., an empty network)."""
+
+    def __init__(self, results=None, **getters):
+        self.results = results
+        self.getters = getters
+
+    def __getattr__(self, attr):
+        if attr in self.getters:
+            return self.getters[attr]
+        if attr.endswith("SubscriptionResults"):
+            return lambda *args: self.results(*args) if self.results else {}
+        return lambda *args: []
+
+
+class FakeBackend(SumoBackend):
+    name = "fake"
+    FatalError = RuntimeError
+
+    def __init__(self, hub_programs):
+        self.loaded = False
+        phase = lambda tls_id: hub_programs[tls_id][0]
+        self.trafficlight = FakeDomain(
+            results=lambda tls_id: {tc.TL_RED_YELLOW_GREEN_STATE: phase(tls_id)},
+            getRedYellowGreenState=phase)
+        self.lane = FakeDomain()
+        self.vehicle = FakeDomain()
+        self.simulation = FakeDomain(
+            results=lambda: dict(zip(SIMULATION_VARS, [0.0, 1, 0, 0])))
+
+    def start(self, command_args):
+        self.loaded = True
+
+    def load(self, args):
+        pass
+
+    def simulation_step(self):
+        pass
+
+    def close(self):
+        self.loaded = False
+
+    def is_loaded(self):
+        return self.loaded
+
+
+@pytest.mark.parametrize("subscribe", [False, True])
+def test_traci_calls_per_step(monkeypatch, subscribe):
+    net_file = NET_FILES[2]
+    programs = {}
+    monkeypatch.setattr("seal.sumo.kernel.kernel.make_backend",
+                        lambda *args, **kwargs: FakeBackend(programs))
+    kernel = SumoKernel({"net-file": net_file, "subscribe": subscribe,
+                         "profile": True, "net_cache": False})
+    programs.update({tls.id: tls.program for tls in kernel.tls_hub})
+    kernel.start()
+    kernel.profiler.end_step(is_reset=True)
+
+    kernel.step()
+    for tls in kernel.tls_hub:
+        tls.get_observation()
+    record = kernel.profiler.end_step()
+
+    n_lanes = sum(len(tls.lane_table.lanes) for tls in kernel.tls_hub)
+    if subscribe:
+        # Only the step itself goes to SUMO; the simulation, lane, and trafficlight
+        # results are read from the subscriptions it delivered.
+        assert record["traci_calls"] == 1
+        assert record["subscription_reads"] == 1 + n_lanes + len(kernel.tls_hub)
+    else:
+        # The step, then one call per lane (for its vehicles, of which there are none)
+        # and per trafficlight (for its phase). The simulation-level values are still
+        # read from their subscription.
+        assert record["traci_calls"] == 1 + n_lanes + len(kernel.tls_hub)
+        assert record["subscription_reads"] == 1
+    kernel.close()
+
+
+@requires_sumo
+def test_profiler_with_pipeline(make_routefile):
+    pytest.importorskip("ray")
+    from seal.sumo.env import SumoEnv
+
+    net_file = NET_FILES[1]
+    env = SumoEnv({"net-file": net_file, "route-files": make_routefile(net_file),
+                   "pipeline": True, "profile": True, "net_cache": False})
+    try:
+        obs = env.reset()
+        n_steps = 0
+        done = {"__all__": False}
+        while not done["__all__"] and n_steps < 200:
+            obs, _, done, info = env.step({tls_id: 0 for tls_id in obs})
+            n_steps += 1
+            profile = next(iter(info.values()))["profile"]
+            # Every step (but the last, which does not simulate) awaits its simulation
+            # step, whose time and TraCI calls are thus recorded as part of it.
+            if not done["__all__"]:
+                assert profile["simulate"] > 0.0
+                assert profile["traci_calls"] > 0
+            assert profile["step"] >= profile.get("simulate", 0.0)
+        summary = env.kernel.profiler.summary()
+        assert summary["step"]["n"] == n_steps
+        assert summary["simulate"]["n"] == summary["step"]["n"] - done["__all__"]
+    finally:
+        env.close()
@@ -0,0 +1,70 @@
+import numpy as np
+import os
+import pytest
+
+from conftest import NET_FILES
+from seal.sumo.config import (GLOBAL_RANK, LANE_OCCUPANCY, LOCAL_RANK,
+                              N_RANKED_FEATURES)
+from seal.sumo.kernel.trafficlight.hub import TrafficLightHub
+
+
+def loop_ranks(obs, graph):
+    """The original per-trafficlight ranking loop that `rank_matrix()` replaces."""
+    pairs = [(tls_id, tls_state[LANE_OCCUPANCY]) for tls_id, tls_state in obs.items()]
+    pairs = sorted(pairs, key=lambda x: x[1], reverse=True)
+
+    for global_rank, (tls_id, _) in enumerate(pairs):
+        try:
+            obs[tls_id][GLOBAL_RANK] = 1 - (global_rank / (len(graph)-1))
+        except ZeroDivisionError:
+            obs[tls_id][GLOBAL_RANK] = 1
+
+    for tls_id in graph:
+        local_rank = 0
+        for neighbor in graph[tls_id]:
+            if obs[tls_id][GLOBAL_RANK] > obs[neighbor][GLOBAL_RANK]:
+                local_rank += 1
+        try:
+            obs[tls_id][LOCAL_RANK] = 1 - (local_rank / len(graph[tls_id]))
+        except ZeroDivisionError:
+            obs[tls_id][LOCAL_RANK] = 1
+
+
+@pytest.fixture(scope="module", params=NET_FILES, ids=os.path.basename)
+def hub(request):
+    return TrafficLightHub(request.param, ranked=True, use_cache=False)
+
+
+@pytest.mark.parametrize("case", ["random", "ties", "zeros"])
+def test_rank_matrix_matches_loop(hub, case):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        obs_matrix = rng.random((len(hub), N_RANKED_FEATURES))
+        if case == "ties":
+            obs_matrix[:, LANE_OCCUPANCY] = rng.integers(2, size=len(hub)) / 2
+        elif case == "zeros":
+            obs_matrix[:, LANE_OCCUPANCY] = 0.0
+        obs = {tls_id: obs_matrix[index].copy() for index, tls_id in enumerate(hub.ids)}
+
+        loop_ranks(obs, hub.tls_graph)
+        hub.rank_matrix(obs_matrix)
+        for index, tls_id in enumerate(hub.ids):
+            assert obs_matrix[index, GLOBAL_RANK] == obs[tls_id][GLOBAL_RANK]
+            assert obs_matrix[index, LOCAL_RANK] == obs[tls_id][LOCAL_RANK]
+
+
+def test_float32_matrix_ranks_by_float64_occupancy(hub):
+    # Occupancies that only differ beyond float32 precision (e.g., 10/488 and
+    # 10/487.99999999999994 on complex_inter) must not tie in the float32 matrix.
+    occupancy = 10 / (488 - np.arange(len(hub)) * 2e-13)
+    obs_matrix = np.zeros((len(hub), N_RANKED_FEATURES), dtype=np.float32)
+    obs_matrix[:, LANE_OCCUPANCY] = occupancy
+    obs = {tls_id: np.zeros(N_RANKED_FEATURES) for tls_id in hub.ids}
+    for index, tls_id in enumerate(hub.ids):
+        obs[tls_id][LANE_OCCUPANCY] = occupancy[index]
+
+    loop_ranks(obs, hub.tls_graph)
+    hub.rank_matrix(obs_matrix, occupancy)
+    for index, tls_id in enumerate(hub.ids):
+        assert obs_matrix[index, GLOBAL_RANK] == np.float32(obs[tls_id][GLOBAL_RANK])
+        assert obs_matrix[index, LOCAL_RANK] == np.float32(obs[tls_id][LOCAL_RANK])
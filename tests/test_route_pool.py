@@ -0,0 +1,24 @@
+from conftest import NET_FILES
+from seal.sumo.utils.route_pool import RoutePool
+
+
+def test_seeded_pools_yield_the_same_routes(tmp_path):
+    sequences = []
+    for name in ["a", "b"]:
+        directory = tmp_path / name
+        directory.mkdir()
+        pool = RoutePool(NET_FILES[2], str(directory), size=3, seed=7,
+                         rand_args={"n_vehicles": (50, 200), "router": "python"})
+        try:
+            sequence = []
+            for _ in range(6):
+                with open(pool.get()) as f:
+                    # Skip the XML header, which holds the generation time.
+                    routes = f.read()
+                sequence.append(routes[routes.index("<routes"):])
+            sequences.append(sequence)
+        finally:
+            pool.close()
+    assert sequences[0] == sequences[1]
+    # Each route file of the sequence is generated with its own seed.
+    assert len(set(sequences[0])) == len(sequences[0])
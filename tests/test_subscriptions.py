@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from conftest import NET_FILES, requires_sumo
+from seal.sumo.kernel.kernel import SumoKernel
+
+
+@requires_sumo
+@pytest.mark.parametrize("net_file", NET_FILES)
+def test_subscribed_observations_match_polled(net_file, make_routefile):
+    kernel = SumoKernel({"net-file": net_file, "route-files": make_routefile(net_file),
+                         "subscribe": True, "net_cache": False})
+    kernel.start()
+    try:
+        n_vehicles = 0
+        for _ in range(300):
+            kernel.step()
+            for tls in kernel.tls_hub:
+                subscribed = tls.get_observation()
+                tls.subscribed = False
+                polled = tls.get_observation()
+                tls.subscribed = True
+                np.testing.assert_allclose(subscribed, polled)
+            n_vehicles += kernel.sim_state.departed
+        # Make sure that the observations were compared with traffic on the net.
+        assert n_vehicles > 0
+    finally:
+        kernel.close()